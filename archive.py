@@ -0,0 +1,95 @@
+"""基于 mmap 的只读地图归档，支持按下标和按种子的随机访问
+
+归档文件即 map_format 写出的二进制文件。读取时不复制记录内容：
+MapArchive 返回的 MapView 的字段都是映射上的零拷贝切片，只有 to_map_data 会复制。
+"""
+from typing import Any, Iterator, List, Optional, Tuple
+from map_data import MapData, FLAG_MAIN_PATH
+from map_format import RECORD_HEADER, MapFile, MapWriter, decode_map, _int_view
+from models import Room, Edge
+
+
+class MapView:
+    """归档中单张地图的只读视图，字段均为映射上的切片"""
+    __slots__ = ('width', 'height', 'seed', 'room_count',
+                 'room_x', 'room_y', 'room_w', 'room_h',
+                 'room_types', 'distances', 'flags', 'edges', '_buf', '_offset')
+
+    def __init__(self, buf: memoryview, offset: int) -> None:
+        width, height, count, has_seed, seed = RECORD_HEADER.unpack_from(buf, offset)
+        self.width: int = width
+        self.height: int = height
+        self.room_count: int = count
+        self.seed: Optional[int] = seed if has_seed else None
+        # 自身持有切片，归档释放整体视图后仍可复制记录
+        self._buf = buf[offset:]
+        self._offset = 0
+
+        pos = offset + RECORD_HEADER.size
+        self.room_x = _int_view(buf[pos:pos + count * 2], 'H')
+        pos += count * 2
+        self.room_y = _int_view(buf[pos:pos + count * 2], 'H')
+        pos += count * 2
+        self.room_w = buf[pos:pos + count]
+        pos += count
+        self.room_h = buf[pos:pos + count]
+        pos += count
+        self.room_types = buf[pos:pos + count]
+        pos += count
+        self.distances = _int_view(buf[pos:pos + count * 2], 'h')
+        pos += count * 2
+        self.flags = buf[pos:pos + count]
+        pos += count
+        self.edges = buf[pos:pos + (width * height * 2 + 7) // 8]
+
+    def edge_bits(self, pos: Tuple[int, int]) -> int:
+        """获取单元格的边位（EDGE_RIGHT | EDGE_DOWN）"""
+        bit = ((pos[1] - 1) * self.width + (pos[0] - 1)) * 2
+        return (self.edges[bit >> 3] >> (bit & 7)) & 3
+
+    def main_path(self) -> List[int]:
+        """按距离排序返回主路径上的房间下标"""
+        path = [i for i in range(self.room_count) if self.flags[i] & FLAG_MAIN_PATH]
+        return sorted(path, key=lambda i: self.distances[i])
+
+    def to_map_data(self) -> MapData:
+        """复制为可修改的 MapData"""
+        return decode_map(self._buf, self._offset)
+
+    def to_rooms(self) -> List[Room]:
+        return self.to_map_data().to_rooms()
+
+    def to_edges(self) -> List[Edge]:
+        return self.to_map_data().to_edges()
+
+
+class MapArchive(MapFile):
+    """只读地图归档
+
+    archive[i] 按写入顺序返回 MapView，archive.by_seed(s) 在种子表中二分查找。
+    返回的视图引用归档的映射，归档关闭后映射要等到视图全部释放才真正关闭。
+    """
+
+    def __getitem__(self, index: int) -> MapView:  # type: ignore[override]
+        return MapView(self.buf, self.record_offset(index))
+
+    def __iter__(self) -> Iterator[MapView]:  # type: ignore[override]
+        for index in range(self.count):
+            yield self[index]
+
+    def by_seed(self, seed: int) -> MapView:  # type: ignore[override]
+        """按种子获取地图视图"""
+        return self[self.index_of_seed(seed)]
+
+    def __enter__(self) -> 'MapArchive':  # type: ignore[override]
+        return self
+
+
+def build_archive(path: str, maps: Any) -> int:
+    """将 MapGenerator 或 MapData 序列写入归档，返回写入数量"""
+    count = 0
+    with MapWriter(path) as writer:
+        for item in maps:
+            writer.write(item if isinstance(item, MapData) else MapData.from_generator(item))
+            count += 1
+    return count
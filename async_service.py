@@ -0,0 +1,201 @@
+"""基于 asyncio 的并发地图服务，生成与 PNG 编码在有界进程池中执行
+
+    python async_service.py --port 8766 --workers 4 --max-pending 64
+
+接口与 service.py 相同（/map、/render、/stats）。
+相同 (配置, 种子) 的并发请求共享同一次计算；排队与执行中的任务数达到
+max_pending 时，新的计算请求立即返回 503，已缓存的结果不受影响。
+"""
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from batch import generate_map
+from map_data import MapData
+from service import image_key, map_key, parse_request, render_png
+from structures import LRUCache
+from config import MapConfig
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               503: 'Service Unavailable'}
+
+
+class Overloaded(Exception):
+    """等待计算的任务已达上限"""
+
+
+def _render_job(config: MapConfig, seed: int, data: Optional[MapData]) -> Tuple[MapData, bytes]:
+    """在工作进程中生成（如未提供）并渲染地图"""
+    if data is None:
+        data = generate_map(config, seed)
+    return data, render_png(config, data)
+
+
+class AsyncMapService:
+    """带缓存、请求合并与背压的异步地图服务"""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: int = 64,
+                 max_maps: int = 4096, max_images: int = 256) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.maps: LRUCache[Tuple[Any, ...], MapData] = LRUCache(max_maps)
+        self.images: LRUCache[Tuple[Any, ...], bytes] = LRUCache(max_images)
+        # 进行中的计算，键为 ('map'|'image', 缓存键)
+        self.inflight: Dict[Tuple[str, Tuple[Any, ...]], 'asyncio.Future[Any]'] = {}
+        self.metrics: Dict[str, int] = {
+            'requests': 0, 'computed': 0, 'coalesced': 0, 'rejected': 0, 'errors': 0,
+            'max_queue_depth': 0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        """已提交到进程池、尚未完成的计算数"""
+        return len(self.inflight)
+
+    async def _compute(self, key: Tuple[str, Tuple[Any, ...]], job: Callable[..., Any], *args: Any) -> Any:
+        """提交计算，相同 key 的并发调用等待同一结果"""
+        future = self.inflight.get(key)
+        if future is not None:
+            self.metrics['coalesced'] += 1
+            return await asyncio.shield(future)
+        if len(self.inflight) >= self.max_pending:
+            self.metrics['rejected'] += 1
+            raise Overloaded()
+
+        future = asyncio.get_running_loop().run_in_executor(self.executor, job, *args)
+        self.inflight[key] = future
+        # 计算结束时才移除，首个等待者被取消时后续相同请求仍合并到进行中的任务
+        future.add_done_callback(lambda done: self._finish(key, done))
+        self.metrics['computed'] += 1
+        self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], len(self.inflight))
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Tuple[str, Tuple[Any, ...]], future: 'asyncio.Future[Any]') -> None:
+        if self.inflight.get(key) is future:
+            del self.inflight[key]
+
+    async def get_map(self, config: MapConfig, seed: int) -> MapData:
+        key = map_key(config, seed)
+        data = self.maps.get(key)
+        if data is None:
+            data = await self._compute(('map', key), generate_map, config, seed)
+            self.maps.put(key, data)
+        return data
+
+    async def get_png(self, config: MapConfig, seed: int) -> bytes:
+        key = image_key(config, seed)
+        png = self.images.get(key)
+        if png is None:
+            cached_map = self.maps.get(map_key(config, seed))
+            data, png = await self._compute(('image', key), _render_job, config, seed, cached_map)
+            self.maps.put(map_key(config, seed), data)
+            self.images.put(key, png)
+        return png
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'queue_depth': self.queue_depth,
+            **self.metrics,
+            'maps': self.maps.stats(),
+            'images': self.images.stats(),
+        }
+
+    async def handle(self, method: str, target: str) -> Tuple[int, str, bytes]:
+        """处理单个请求，返回 (状态码, Content-Type, 正文)"""
+        if method != 'GET':
+            return 405, 'application/json', b'{"error": "Method not allowed"}'
+        url = urlsplit(target)
+        self.metrics['requests'] += 1
+        try:
+            if url.path == '/stats':
+                return 200, 'application/json', json.dumps(self.stats()).encode()
+            if url.path == '/map':
+                config, seed = parse_request(url.query)
+                data = await self.get_map(config, seed)
+                return 200, 'application/json', json.dumps(data.to_dict()).encode()
+            if url.path == '/render':
+                config, seed = parse_request(url.query)
+                return 200, 'image/png', await self.get_png(config, seed)
+            return 404, 'application/json', b'{"error": "Not found"}'
+        except Overloaded:
+            return 503, 'application/json', b'{"error": "Too many pending requests"}'
+        except (TypeError, ValueError) as e:
+            return 400, 'application/json', json.dumps({'error': str(e)}).encode()
+        except Exception as e:
+            self.metrics['errors'] += 1
+            return 500, 'application/json', json.dumps({'error': repr(e)}).encode()
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个 HTTP/1.1 连接，支持 keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    break
+
+                status, content_type, body = await self.handle(parts[0], parts[1])
+                keep_alive = headers.get('connection', '').lower() != 'close' and parts[2] == 'HTTP/1.1'
+                head = (f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "Error")}\r\n'
+                        f'Content-Type: {content_type}\r\n'
+                        f'Content-Length: {len(body)}\r\n'
+                        f'Connection: {"keep-alive" if keep_alive else "close"}\r\n')
+                if status == 503:
+                    head += 'Retry-After: 1\r\n'
+                writer.write(head.encode('latin-1') + b'\r\n' + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+
+async def serve(host: str, port: int, service: AsyncMapService) -> None:
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    print(f'Serving on http://{host}:{server.sockets[0].getsockname()[1]} '
+          f'({service.workers} workers, max {service.max_pending} pending)', flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Concurrent map generation service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认使用全部CPU')
+    parser.add_argument('--max-pending', type=int, default=64)
+    parser.add_argument('--max-maps', type=int, default=4096)
+    parser.add_argument('--max-images', type=int, default=256)
+    args = parser.parse_args()
+
+    service = AsyncMapService(args.workers, args.max_pending, args.max_maps, args.max_images)
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
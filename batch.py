@@ -0,0 +1,92 @@
+import hashlib
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from map_generator import MapGenerator
+from map_data import MapData
+from profiling import GenerationStats, Profiler
+from config import MapConfig, DEFAULT_CONFIG
+
+
+def derive_seed(seed: int, index: int) -> int:
+    """由批次种子和地图序号派生出该地图的独立种子"""
+    digest = hashlib.blake2b(f'{seed}:{index}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def generate_map(config: MapConfig, seed: int, profiler: Optional[Profiler] = None) -> MapData:
+    """使用独立的随机数生成器生成单张地图，给出 profiler 时统计各阶段耗时"""
+    generator = MapGenerator(config, random.Random(seed))
+    if profiler is not None:
+        profiler.attach(generator)
+    generator.generate()
+    return generator.to_map_data(seed)
+
+
+def _generate_range(config: MapConfig, seed: int, start: int, stop: int) -> List[MapData]:
+    """生成序号在 [start, stop) 内的地图，供进程池调用"""
+    return [generate_map(config, derive_seed(seed, i)) for i in range(start, stop)]
+
+
+def _profile_range(config: MapConfig, seed: int, start: int, stop: int) -> GenerationStats:
+    """统计序号在 [start, stop) 内的地图的生成耗时，供进程池调用"""
+    profiler = Profiler()
+    for i in range(start, stop):
+        generate_map(config, derive_seed(seed, i), profiler)
+    return profiler.stats
+
+
+def generate_batch(config: MapConfig = DEFAULT_CONFIG, count: Optional[int] = None,
+                   seed: int = 0, workers: Optional[int] = 1,
+                   chunk_size: int = 256) -> List[MapData]:
+    """批量生成地图
+    
+    每张地图的种子由 (seed, 序号) 派生，因此结果与 workers 数量无关。
+    
+    Args:
+        config: 地图生成配置
+        count: 生成数量，默认使用 config.generator_count
+        seed: 批次种子
+        workers: 进程数，None 表示使用全部CPU，1 表示在当前进程中生成
+        chunk_size: 每个任务包含的地图数量
+    """
+    if count is None:
+        count = config.generator_count
+    if workers is None:
+        workers = os.cpu_count() or 1
+    
+    if workers <= 1 or count <= chunk_size:
+        return _generate_range(config, seed, 0, count)
+    
+    maps: List[MapData] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_generate_range, config, seed, start, min(start + chunk_size, count))
+                   for start in range(0, count, chunk_size)]
+        for future in futures:
+            maps.extend(future.result())
+    return maps
+
+
+def profile_batch(config: MapConfig = DEFAULT_CONFIG, count: Optional[int] = None,
+                  seed: int = 0, workers: Optional[int] = 1,
+                  chunk_size: int = 256) -> GenerationStats:
+    """按 generate_batch 的方式生成地图，只返回汇总后的统计结果
+    
+    多进程时各进程的耗时直接相加，因此 wall 为所有进程的累计时间。
+    """
+    if count is None:
+        count = config.generator_count
+    if workers is None:
+        workers = os.cpu_count() or 1
+    
+    if workers <= 1 or count <= chunk_size:
+        return _profile_range(config, seed, 0, count)
+    
+    stats = GenerationStats()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_profile_range, config, seed, start, min(start + chunk_size, count))
+                   for start in range(0, count, chunk_size)]
+        for future in futures:
+            stats.merge(future.result())
+    return stats
@@ -0,0 +1 @@
+"""性能基准脚本，使用 python -m benchmarks.<name> 运行"""
@@ -0,0 +1,43 @@
+"""验证 generate_base_map 的耗时随单元格数量线性增长"""
+import random
+import time
+from map_generator import MapGenerator
+from config import MapConfig
+
+
+class LegacyMapGenerator(MapGenerator):
+    """每一步都重新扫描全部可用位置的原实现，用作对照"""
+
+    def generate_base_map(self):  # type: ignore[override]
+        start_pos = (1, 1)
+        self.room_types[start_pos] = 'start'
+        self.set_pending_pos(start_pos)
+        connected = {start_pos}
+        while self.available_pos:
+            available_connected = [
+                pos for pos in self.available_pos
+                if any((pos[0] + dx, pos[1] + dy) in connected
+                       for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)])
+            ]
+            pos = self.rng.choice(available_connected) if available_connected \
+                else self.rng.choice(list(self.available_pos))
+            self.set_pending_pos(pos)
+            connected.add(pos)
+        return start_pos, connected
+
+
+def bench(generator_class: type, size: int) -> float:
+    generator = generator_class(MapConfig(grid_width=size, grid_height=size), random.Random(0))
+    start = time.perf_counter()
+    generator.generate_base_map()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    for size in (50, 100, 200, 500):
+        elapsed = bench(MapGenerator, size)
+        line = f'{size}x{size}: {elapsed * 1e3:8.1f}ms {elapsed / size ** 2 * 1e6:.2f}us/cell'
+        if size <= 100:
+            legacy = bench(LegacyMapGenerator, size)
+            line += f'  legacy={legacy * 1e3:.1f}ms ({legacy / elapsed:.0f}x)'
+        print(line)
@@ -0,0 +1,97 @@
+"""对地图服务进行并发压测，报告吞吐量与尾延迟
+
+    python async_service.py --port 8766 &
+    python -m benchmarks.load_test --port 8766 --concurrency 32 --requests 2000 --seeds 200
+
+--seeds 控制不同种子的数量：种子越少，缓存命中与请求合并越多。
+"""
+import argparse
+import asyncio
+import collections
+import json
+import random
+import time
+from typing import Counter, List, Tuple
+from urllib.parse import urlencode
+
+
+async def fetch(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                host: str, path: str) -> Tuple[int, bytes]:
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host: str, port: int, paths: 'asyncio.Queue[str]',
+                 latencies: List[float], statuses: Counter[int]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                path = paths.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            status, _ = await fetch(reader, writer, host, path)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    paths: 'asyncio.Queue[str]' = asyncio.Queue()
+    for _ in range(args.requests):
+        query = urlencode({'seed': rng.randrange(args.seeds), 'grid_width': args.grid,
+                           'grid_height': args.grid, 'map_length': args.map_length})
+        paths.put_nowait(f'/{args.endpoint}?{query}')
+
+    latencies: List[float] = []
+    statuses: Counter[int] = collections.Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, paths, latencies, statuses)
+                           for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e3
+
+    print(f'{len(latencies)} requests in {elapsed:.2f}s: {len(latencies) / elapsed:.1f} req/s')
+    print(f'latency p50={percentile(0.5):.2f}ms p95={percentile(0.95):.2f}ms '
+          f'p99={percentile(0.99):.2f}ms max={latencies[-1] * 1e3:.2f}ms')
+    print(f'status {dict(sorted(statuses.items()))}')
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, body = await fetch(reader, writer, args.host, '/stats')
+    writer.close()
+    print(f'server {json.loads(body)}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--endpoint', choices=('render', 'map'), default='render')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--seeds', type=int, default=200, help='不同种子的数量')
+    parser.add_argument('--grid', type=int, default=5)
+    parser.add_argument('--map-length', type=int, default=512)
+    parser.add_argument('--seed', type=int, default=0, help='请求序列的随机种子')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
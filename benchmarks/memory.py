@@ -0,0 +1,63 @@
+"""比较 Room/Edge 对象与 MapData 紧凑表示的单张地图内存占用"""
+import argparse
+import random
+import tracemalloc
+from typing import Callable, List, Tuple
+from map_generator import MapGenerator
+from map_data import MapData
+from models import Room, Edge
+from config import MapConfig
+
+
+def build_pool(config: MapConfig, size: int) -> List[MapGenerator]:
+    random.seed(0)
+    pool = []
+    for _ in range(size):
+        generator = MapGenerator(config)
+        generator.generate()
+        pool.append(generator)
+    return pool
+
+
+def measure(count: int, build: Callable[[int], object]) -> float:
+    """返回持有 count 张地图时每张地图的平均字节数"""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    maps = [build(i) for i in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del maps
+    return used / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--sample-limit', type=int, default=100000,
+                        help='超过该数量时按采样结果线性外推')
+    parser.add_argument('--grid', type=int, default=5)
+    args = parser.parse_args()
+
+    pool = build_pool(MapConfig(grid_width=args.grid, grid_height=args.grid), 64)
+
+    def as_objects(i: int) -> Tuple[List[Room], List[Edge]]:
+        generator = pool[i % len(pool)]
+        return ([Room(r.topLeft, r.size, r.color, r.description) for r in generator.pending_room],
+                [Edge(e.start, e.direction) for e in generator.edges])
+
+    def as_map_data(i: int) -> MapData:
+        return MapData.from_generator(pool[i % len(pool)])
+
+    print(f'grid={args.grid}x{args.grid}')
+    for count in args.counts:
+        sampled = min(count, args.sample_limit)
+        objects = measure(sampled, as_objects)
+        compact = measure(sampled, as_map_data)
+        note = '' if sampled == count else f' (extrapolated from {sampled})'
+        print(f'maps={count:>8} objects={objects:.0f}B/map ({objects * count / 2**20:.1f}MiB) '
+              f'map_data={compact:.0f}B/map ({compact * count / 2**20:.1f}MiB) '
+              f'ratio={objects / compact:.1f}x{note}')
+
+
+if __name__ == '__main__':
+    main()
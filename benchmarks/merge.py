@@ -0,0 +1,18 @@
+"""测量 merge_rooms 在不同网格尺寸下的耗时与房间尺寸分布"""
+import collections
+import random
+import time
+from map_generator import MapGenerator
+from config import MapConfig
+
+
+if __name__ == '__main__':
+    for size in (50, 100, 200, 500):
+        generator = MapGenerator(MapConfig(grid_width=size, grid_height=size), random.Random(0))
+        generator.generate_base_map()
+        start = time.perf_counter()
+        generator.merge_rooms()
+        elapsed = time.perf_counter() - start
+        sizes = collections.Counter(room.size for room in generator.pending_room)
+        merged = {f'{w}x{h}': count for (w, h), count in sorted(sizes.items()) if (w, h) != (1, 1)}
+        print(f'{size}x{size}: {elapsed * 1e3:8.1f}ms {elapsed / size ** 2 * 1e6:.2f}us/cell {merged}')
@@ -0,0 +1,25 @@
+"""比较逐张生成与 NumPy 批量内核的吞吐量"""
+import time
+from batch import derive_seed, generate_map
+from numpy_batch import generate_arrays
+from config import MapConfig
+
+
+def bench(grid: int, count: int) -> None:
+    config = MapConfig(grid_width=grid, grid_height=grid)
+    python_count = max(count // 10, 50)
+    start = time.perf_counter()
+    for i in range(python_count):
+        generate_map(config, derive_seed(0, i))
+    python_rate = python_count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    generate_arrays(config, count, seed=0)
+    numpy_rate = count / (time.perf_counter() - start)
+    print(f'grid={grid:>3} python={python_rate:9.0f} maps/s numpy={numpy_rate:9.0f} maps/s '
+          f'speedup={numpy_rate / python_rate:.1f}x')
+
+
+if __name__ == '__main__':
+    for grid, count in ((5, 20000), (9, 8000), (13, 4000), (25, 1000)):
+        bench(grid, count)
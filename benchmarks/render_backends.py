@@ -0,0 +1,32 @@
+"""比较 PIL 与 NumPy 渲染后端在不同图像尺寸下的耗时
+
+NumPy 后端不绘制文字，两者都以 show_labels=False 渲染以保证可比。
+"""
+import time
+from dataclasses import replace
+from batch import generate_batch
+from renderer import get_renderer_class
+from config import MapConfig
+
+
+def bench(grid: int, map_length: int, backend: str, repeat: int = 3) -> float:
+    config = MapConfig(grid_width=grid, grid_height=grid, map_length=map_length,
+                       edge_width=max(2, map_length // grid // 4), renderer=backend,
+                       show_labels=False)
+    data = generate_batch(replace(config, renderer='pil'), 1, seed=0)[0]
+    renderer_class = get_renderer_class(config)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        renderer_class.from_map_data(data, config).render()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    for grid in (5, 13, 50):
+        for map_length in (512, 768, 4096):
+            pil = bench(grid, map_length, 'pil')
+            numpy = bench(grid, map_length, 'numpy')
+            print(f'grid={grid:>3} px={map_length:>5} pil={pil * 1e3:8.2f}ms '
+                  f'numpy={numpy * 1e3:8.2f}ms speedup={pil / numpy:.1f}x')
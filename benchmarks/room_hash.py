@@ -0,0 +1,25 @@
+"""验证房间作为字典键时的查询耗时不随房间数量增长"""
+import time
+from models import Room
+from config import RoomType
+
+
+def bench(count: int, rounds: int = 20000) -> float:
+    rooms = [Room((i, 1), (1, 1), RoomType.PENDING) for i in range(count)]
+    distances = {room: i for i, room in enumerate(rooms)}
+    probes = [Room(room.topLeft, room.size, room.color, id=room.id)
+              for room in rooms[:: max(1, count // 100)]]
+    
+    start = time.perf_counter()
+    for i in range(rounds):
+        distances[probes[i % len(probes)]]
+    return (time.perf_counter() - start) / rounds
+
+
+if __name__ == '__main__':
+    bench(10)  # 预热
+    baseline = None
+    for count in (10, 100, 1000, 10000, 100000):
+        elapsed = bench(count)
+        baseline = baseline or elapsed
+        print(f'rooms={count:>6} lookup={elapsed * 1e9:.0f}ns ratio={elapsed / baseline:.2f}')
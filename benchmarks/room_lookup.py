@@ -0,0 +1,56 @@
+"""比较线性扫描与网格索引的房间查询耗时"""
+import random
+import time
+from typing import List, Optional, Tuple
+from models import Room, RoomGrid
+from config import RoomType
+
+
+def build_rooms(width: int, height: int) -> List[Room]:
+    """按行铺满 1x1 与 1x2 房间"""
+    rooms = []
+    for y in range(1, height + 1):
+        x = 1
+        while x <= width:
+            w = 2 if x < width and (x + y) % 3 == 0 else 1
+            rooms.append(Room((x, y), (w, 1), RoomType.PENDING))
+            x += w
+    return rooms
+
+
+def linear_get_room(rooms: List[Room], pos: Tuple[int, int]) -> Optional[Room]:
+    """原有的逐个房间扫描实现"""
+    for room in rooms:
+        if pos[0] >= room.topLeft[0] and pos[0] < room.topLeft[0] + room.size[0] and \
+           pos[1] >= room.topLeft[1] and pos[1] < room.topLeft[1] + room.size[1]:
+            return room
+    return None
+
+
+def bench(width: int, height: int, samples: int = 2000) -> None:
+    rooms = build_rooms(width, height)
+    grid = RoomGrid(width, height)
+    for room in rooms:
+        grid.place(room)
+    
+    rng = random.Random(0)
+    queries = [(rng.randint(1, width), rng.randint(1, height)) for _ in range(samples)]
+    
+    start = time.perf_counter()
+    for pos in queries:
+        linear_get_room(rooms, pos)
+    linear = (time.perf_counter() - start) / samples
+    
+    start = time.perf_counter()
+    for pos in queries:
+        grid.get(pos)
+    indexed = (time.perf_counter() - start) / samples
+    
+    print(f'{width}x{height}: rooms={len(rooms)} '
+          f'linear={linear * 1e6:.2f}us indexed={indexed * 1e6:.3f}us '
+          f'speedup={linear / indexed:.0f}x')
+
+
+if __name__ == '__main__':
+    for size in (50, 200):
+        bench(size, size)
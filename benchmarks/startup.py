@@ -0,0 +1,89 @@
+"""测量各入口模块的导入耗时与进程内存，以及只生成数据和附带渲染时的工作进程内存
+
+每项测量都在新的解释器中进行，避免模块缓存影响结果。
+
+    python benchmarks/startup.py --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'pil': 'PIL' in sys.modules,
+                  'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+WORKER_PROBE = """
+import resource, sys
+from concurrent.futures import ProcessPoolExecutor
+from batch import derive_seed
+from pipeline import iter_maps
+from config import MapConfig
+
+def work(seed):
+    for _ in iter_maps(MapConfig(grid_width=5, grid_height=5), 50, seed=seed, render={render}):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'PIL' in sys.modules
+
+if __name__ == '__main__':
+    with ProcessPoolExecutor(max_workers={workers}) as executor:
+        results = list(executor.map(work, range({workers})))
+    print(json.dumps({{'rss_kb': [rss for rss, _ in results], 'pil': any(pil for _, pil in results)}}))
+"""
+
+
+def run_probe(source: str) -> Dict:
+    """在新解释器中运行探针脚本，返回其输出的 JSON"""
+    output = subprocess.run([sys.executable, '-c', 'import json\n' + source], cwd=ROOT,
+                            env=dict(os.environ, PYTHONPATH=ROOT),
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_import(module: str, repeat: int) -> Dict:
+    """多次冷启动导入，返回最快一次的耗时与内存"""
+    runs = [run_probe(IMPORT_PROBE.format(module=module)) for _ in range(repeat)]
+    best = min(runs, key=lambda run: run['seconds'])
+    return {'module': module, 'seconds': best['seconds'], 'rss_kb': best['rss_kb'], 'pil': best['pil']}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modules', nargs='+',
+                        default=['map_data', 'map_generator', 'batch', 'constraints', 'pipeline', 'renderer'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    imports: List[Dict] = []
+    for module in args.modules:
+        result = measure_import(module, args.repeat)
+        imports.append(result)
+        print(f"import {module:<14} {result['seconds'] * 1e3:8.1f} ms "
+              f"{result['rss_kb'] / 1024:7.1f} MiB  PIL={'yes' if result['pil'] else 'no'}")
+
+    workers: Dict[str, Dict] = {}
+    for render in (False, True):
+        result = run_probe(WORKER_PROBE.format(render=render, workers=args.workers))
+        label = 'render' if render else 'data-only'
+        workers[label] = result
+        average = sum(result['rss_kb']) / len(result['rss_kb']) / 1024
+        print(f"worker {label:<10} {average:7.1f} MiB peak RSS  PIL={'yes' if result['pil'] else 'no'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'imports': imports, 'workers': workers}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
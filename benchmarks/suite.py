@@ -0,0 +1,225 @@
+"""地图生成与渲染的基准矩阵，结果写入 JSON 并可与基线比较
+
+    python -m benchmarks.suite --quick
+    python -m benchmarks.suite --output benchmarks/baseline.json
+    python -m benchmarks.suite --baseline bench.json --tolerance 0.25 --repeat 5
+
+每个用例使用固定种子、至少 MIN_SAMPLES 个样本，报告 maps/sec、p50/p99 延迟、
+各阶段平均耗时与峰值内存；样本少于 100 时 p99 即最大值。
+整个矩阵运行 repeat 次，每个指标取各次的中位数，减小单次运行受机器负载影响的漂移。
+默认与提交在仓库中的 benchmarks/baseline.json 比较，任一用例的 p50、峰值内存或阶段耗时
+超出基线 tolerance、p99 超出 tail_tolerance 即以非零状态退出。
+在共享的虚拟机上，即使取 5 次中位数，同一代码两次运行的 p50 仍相差可达 65%，p99 可达 80%，
+默认容差因此高于这一噪声；在安静的机器上可用 --tolerance 0.25 做更严格的检查。
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+from batch import derive_seed
+from map_generator import MapGenerator
+from profiling import Profiler
+from config import MapConfig
+
+GRID_SIZES = (5, 13, 50, 200)
+MERGE_CHANCES = (0.0, 0.7, 1.0)
+MAP_LENGTHS = (512, 768)
+QUICK_GRID_SIZES = (5, 13)
+
+# 每个用例的最少样本数，保证 p99 有意义
+MIN_SAMPLES = 30
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# 参与基线比较的指标，均为越小越好
+COMPARED = ('p50_ms', 'p99_ms', 'peak_kib')
+# 尾部延迟只由少数样本决定，使用单独的容差
+TAIL_METRICS = ('p99_ms',)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def map_count(grid: int, budget: int) -> int:
+    """按单元格数缩放每个用例生成的地图数量，使各用例耗时相近"""
+    return max(MIN_SAMPLES, budget // (grid * grid))
+
+
+@contextmanager
+def quiet_gc() -> Iterator[None]:
+    """计时期间关闭垃圾回收，避免前面用例留下的对象影响后续用例"""
+    gc.collect()
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+
+def bench_generation(config: MapConfig, count: int, seed: int) -> Dict[str, Any]:
+    profiler = Profiler()
+    latencies: List[float] = []
+    with quiet_gc():
+        for i in range(count):
+            generator = profiler.attach(MapGenerator(config, random.Random(derive_seed(seed, i))))
+            start = time.perf_counter()
+            generator.generate()
+            latencies.append(time.perf_counter() - start)
+
+    # 峰值内存单独测量，避免 tracemalloc 影响计时
+    tracemalloc.start()
+    MapGenerator(config, random.Random(derive_seed(seed, 0))).generate()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    stats = profiler.stats
+    return {
+        'maps': count,
+        'maps_per_sec': count / sum(latencies),
+        'p50_ms': percentile(latencies, 0.5) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        'peak_kib': peak / 1024,
+        'phases_ms': {name: timing.wall / count * 1e3 for name, timing in stats.phases.items()},
+        'counters': {name: value / count for name, value in stats.counters.items()},
+    }
+
+
+def bench_render(config: MapConfig, count: int, seed: int) -> Dict[str, Any]:
+    generators = []
+    for i in range(count):
+        generator = MapGenerator(config, random.Random(derive_seed(seed, i)))
+        generator.generate()
+        generators.append(generator)
+
+    # 预热字体与标签缓存
+    generators[0].render()
+    latencies: List[float] = []
+    with quiet_gc():
+        for generator in generators:
+            start = time.perf_counter()
+            generator.render()
+            latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    generators[0].render()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'maps': count,
+        'maps_per_sec': count / sum(latencies),
+        'p50_ms': percentile(latencies, 0.5) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        'peak_kib': peak / 1024,
+    }
+
+
+def run(grids: Tuple[int, ...], seed: int, budget: int, render_maps: int) -> Dict[str, Any]:
+    cases: Dict[str, Any] = {}
+    for grid, merge_chance in itertools.product(grids, MERGE_CHANCES):
+        name = f'generate/grid={grid}/merge={merge_chance}'
+        config = MapConfig(grid_width=grid, grid_height=grid, merge_chance=merge_chance)
+        cases[name] = bench_generation(config, map_count(grid, budget), seed)
+        print(f'{name:<36} {cases[name]["maps_per_sec"]:10.1f} maps/s '
+              f'p50={cases[name]["p50_ms"]:9.3f}ms p99={cases[name]["p99_ms"]:9.3f}ms', flush=True)
+    for grid, map_length in itertools.product(grids, MAP_LENGTHS):
+        name = f'render/grid={grid}/px={map_length}'
+        # 边宽与房间边距随单元格缩小，否则大网格上房间矩形为负宽度
+        cell = map_length // grid
+        config = MapConfig(grid_width=grid, grid_height=grid, map_length=map_length,
+                           edge_width=max(1, min(15, cell // 4)), object_margin=min(3, cell // 4))
+        cases[name] = bench_render(config, max(MIN_SAMPLES, render_maps), seed)
+        print(f'{name:<36} {cases[name]["maps_per_sec"]:10.1f} maps/s '
+              f'p50={cases[name]["p50_ms"]:9.3f}ms p99={cases[name]["p99_ms"]:9.3f}ms', flush=True)
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': seed,
+        'cases': cases,
+    }
+
+
+def median_of_runs(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并多次运行的报告，每个用例的数值指标与阶段耗时取中位数"""
+    def merge(values: List[Any]) -> Any:
+        if isinstance(values[0], dict):
+            return {key: merge([value[key] for value in values if key in value]) for key in values[0]}
+        return statistics.median(values)
+
+    merged = dict(reports[0], repeat=len(reports))
+    merged['cases'] = {name: merge([report['cases'][name] for report in reports])
+                       for name in reports[0]['cases']}
+    return merged
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+            tail_tolerance: float) -> List[str]:
+    """返回比基线慢超过容差的指标描述，p99 使用 tail_tolerance，其余指标使用 tolerance"""
+    regressions = []
+    for name, case in report['cases'].items():
+        base = baseline['cases'].get(name)
+        if base is None:
+            print(f'{name}: not in baseline, skipped', file=sys.stderr)
+            continue
+        metrics = [(key, case[key], base.get(key)) for key in COMPARED]
+        metrics += [(f'phases_ms.{phase}', value, base.get('phases_ms', {}).get(phase))
+                    for phase, value in case.get('phases_ms', {}).items()]
+        for key, value, old in metrics:
+            limit = tail_tolerance if key in TAIL_METRICS else tolerance
+            if old and value > old * (1 + limit):
+                regressions.append(f'{name} {key}: {old:.3f} -> {value:.3f} (+{(value / old - 1) * 100:.0f}%)')
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='写出 JSON 报告的路径')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='用于比较的 JSON 报告')
+    parser.add_argument('--no-baseline', action='store_true', help='不与基线比较')
+    parser.add_argument('--tolerance', type=float, default=0.75, help='允许的相对变慢比例')
+    parser.add_argument('--tail-tolerance', type=float, default=1.5, help='p99 允许的相对变慢比例')
+    parser.add_argument('--repeat', type=int, default=3, help='运行整个矩阵的次数，各指标取中位数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget', type=int, default=20000,
+                        help='每个生成用例的单元格总数，决定生成的地图数量')
+    parser.add_argument('--render-maps', type=int, default=MIN_SAMPLES)
+    parser.add_argument('--quick', action='store_true', help=f'只运行网格尺寸 {QUICK_GRID_SIZES}')
+    parser.add_argument('--grids', type=int, nargs='+')
+    args = parser.parse_args()
+
+    grids = tuple(args.grids) if args.grids else QUICK_GRID_SIZES if args.quick else GRID_SIZES
+    report = median_of_runs([run(grids, args.seed, args.budget, args.render_maps)
+                             for _ in range(max(1, args.repeat))])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if not args.no_baseline and os.path.abspath(args.baseline) != os.path.abspath(args.output or ''):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline.get('python'), baseline.get('machine')) != (report['python'], report['machine']):
+            print(f"baseline was recorded on python {baseline.get('python')} {baseline.get('machine')}",
+                  file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance, args.tail_tolerance)
+        limits = f'{args.tolerance:.0%} (p99 {args.tail_tolerance:.0%})'
+        if regressions:
+            print(f'{len(regressions)} regression(s) over {limits}:', file=sys.stderr)
+            for line in regressions:
+                print(f'  {line}', file=sys.stderr)
+            sys.exit(1)
+        print(f'no regressions over {limits} against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""将多张地图拼成一张总览图
+
+render_collage 在预先分配的画布上逐张渲染并粘贴，任一时刻只保留一张地图的图像；
+write_collage 按行生成横条并依次写入 PNG/PPM 文件，内存占用只与单行横条有关，
+因此可以生成包含上千张地图的总览图。
+
+    python collage.py --count 1000 --columns 40 --thumbnail 128 --output sheet.png
+"""
+import argparse
+import os
+import struct
+import zlib
+from dataclasses import replace
+from typing import Any, BinaryIO, Iterable, Iterator, Optional, Sequence, Tuple
+from PIL import Image
+from map_data import MapData
+from renderer import get_renderer_class
+from config import MapConfig, DEFAULT_CONFIG
+
+BACKGROUND = (255, 255, 255)
+
+
+def thumbnail_config(config: MapConfig, size: int) -> MapConfig:
+    """按比例缩小图像边长、边宽与边距，直接以缩略图尺寸渲染，不绘制文字"""
+    scale = size / config.map_length
+    return replace(config, map_length=size,
+                   page_margin=round(config.page_margin * scale),
+                   object_margin=round(config.object_margin * scale),
+                   edge_width=max(1, round(config.edge_width * scale)),
+                   show_labels=False)
+
+
+def collage_size(count: int, cell: int, columns: int, margin: int) -> Tuple[int, int]:
+    """计算总览图的宽高，没有地图时抛出 ValueError"""
+    if count < 1:
+        raise ValueError("Collage needs at least one map")
+    columns = max(1, min(count, columns))
+    rows = (count + columns - 1) // columns
+    return columns * (cell + margin) + margin, rows * (cell + margin) + margin
+
+
+def render_map(item: Any, config: MapConfig) -> Image.Image:
+    """渲染 MapData、MapView 或已生成的 MapGenerator"""
+    if not hasattr(item, 'to_rooms'):
+        item = MapData.from_generator(item)
+    return get_renderer_class(config).from_map_data(item, config).render()
+
+
+def render_collage(maps: Sequence[Any], config: MapConfig = DEFAULT_CONFIG,
+                   columns: int = 3, margin: int = 20,
+                   thumbnail: Optional[int] = None) -> Image.Image:
+    """将地图逐张渲染到预先分配的画布中
+
+    Args:
+        maps: MapData、MapView 或已生成的 MapGenerator 序列
+        config: 渲染配置
+        columns: 每行最多的地图数
+        margin: 地图之间的边距
+        thumbnail: 缩略图边长，None 表示使用 config.map_length
+    """
+    if thumbnail is not None:
+        config = thumbnail_config(config, thumbnail)
+    cell = config.map_length
+    columns = max(1, min(len(maps), columns))
+    canvas = Image.new('RGB', collage_size(len(maps), cell, columns, margin), BACKGROUND)
+    for i, item in enumerate(maps):
+        row, col = divmod(i, columns)
+        canvas.paste(render_map(item, config), (margin + col * (cell + margin), margin + row * (cell + margin)))
+    return canvas
+
+
+def iter_collage_strips(maps: Iterable[Any], count: int, config: MapConfig = DEFAULT_CONFIG,
+                        columns: int = 3, margin: int = 20,
+                        thumbnail: Optional[int] = None) -> Iterator[Image.Image]:
+    """按从上到下的顺序生成总览图的横条，每行地图一条，最后一条为底部边距
+
+    maps 产出的地图数量必须等于 count，否则抛出 ValueError。
+    """
+    if thumbnail is not None:
+        config = thumbnail_config(config, thumbnail)
+    cell = config.map_length
+    columns = max(1, min(count, columns))
+    width = collage_size(count, cell, columns, margin)[0]
+
+    strip: Optional[Image.Image] = None
+    col = 0
+    rendered = 0
+    for item in maps:
+        if rendered == count:
+            raise ValueError(f"Collage expected {count} maps, got more")
+        if strip is None:
+            strip = Image.new('RGB', (width, cell + margin), BACKGROUND)
+        strip.paste(render_map(item, config), (margin + col * (cell + margin), margin))
+        rendered += 1
+        col += 1
+        if col == columns:
+            yield strip
+            strip, col = None, 0
+    if rendered != count:
+        raise ValueError(f"Collage expected {count} maps, got {rendered}")
+    if strip is not None:
+        yield strip
+    if margin:
+        yield Image.new('RGB', (width, margin), BACKGROUND)
+
+
+class _PngStream:
+    """逐行写入 PNG，图像数据分块压缩为多个 IDAT 块"""
+
+    def __init__(self, f: BinaryIO, width: int, height: int) -> None:
+        self.f = f
+        self.width = width
+        self.compressor = zlib.compressobj(6)
+        f.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def _chunk(self, kind: bytes, data: bytes) -> None:
+        self.f.write(struct.pack('>I', len(data)) + kind + data +
+                     struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    def write(self, image: Image.Image) -> None:
+        raw = image.tobytes()
+        stride = self.width * 3
+        # 每行前加过滤类型 0（不过滤）
+        rows = b''.join(b'\x00' + raw[i:i + stride] for i in range(0, len(raw), stride))
+        data = self.compressor.compress(rows)
+        if data:
+            self._chunk(b'IDAT', data)
+
+    def close(self) -> None:
+        self._chunk(b'IDAT', self.compressor.flush())
+        self._chunk(b'IEND', b'')
+
+
+def write_collage(path: str, maps: Iterable[Any], count: int, config: MapConfig = DEFAULT_CONFIG,
+                  columns: int = 3, margin: int = 20, thumbnail: Optional[int] = None) -> Tuple[int, int]:
+    """按横条将总览图写入 .png 或 .ppm 文件，返回图像宽高
+
+    maps 可以是生成器，count 为其中地图的数量。
+    """
+    cell = thumbnail if thumbnail is not None else config.map_length
+    width, height = collage_size(count, cell, columns, margin)
+    strips = iter_collage_strips(maps, count, config, columns, margin, thumbnail)
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in ('.png', '.ppm'):
+        raise ValueError(f"Unsupported collage format: {path}")
+    written = 0
+    with open(path, 'wb') as f:
+        try:
+            if suffix == '.ppm':
+                f.write(f'P6\n{width} {height}\n255\n'.encode())
+                for strip in strips:
+                    f.write(strip.tobytes())
+                    written += strip.height
+            else:
+                png = _PngStream(f, width, height)
+                for strip in strips:
+                    png.write(strip)
+                    written += strip.height
+                png.close()
+            if written != height:
+                raise ValueError(f"Collage wrote {written} rows, header declares {height}")
+        except Exception:
+            # 不留下文件头与内容不符的残缺文件
+            f.close()
+            os.remove(path)
+            raise
+    return width, height
+
+
+def main() -> None:
+    from batch import derive_seed, generate_map
+
+    parser = argparse.ArgumentParser(description='Write a contact sheet of generated maps')
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--grid', type=int, default=5)
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--margin', type=int, default=20)
+    parser.add_argument('--thumbnail', type=int, default=None)
+    parser.add_argument('--output', default='collage.png')
+    args = parser.parse_args()
+
+    config = MapConfig(grid_width=args.grid, grid_height=args.grid)
+    maps = (generate_map(config, derive_seed(args.seed, i)) for i in range(args.count))
+    width, height = write_collage(args.output, maps, args.count, config,
+                                  args.columns, args.margin, args.thumbnail)
+    print(f'Wrote {width}x{height} collage of {args.count} maps to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
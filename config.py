@@ -1,4 +1,4 @@
-from typing import Dict, NamedTuple
+from typing import Dict, List, NamedTuple
 from dataclasses import dataclass
 
 @dataclass
@@ -12,6 +12,9 @@ class MapConfig:
     object_margin: int = 3
     map_length: int = 768
     edge_width: int = 15
+    renderer: str = 'pil'  # 'pil' 或 'numpy'；numpy 不绘制文字，需同时设置 show_labels=False
+    show_labels: bool = True  # 是否绘制房间文字
+    show_descriptions: bool = True  # 是否在标签中附带距离、leaf、main_path 等调试信息
 
 class RoomType:
     """房间类型常量"""
@@ -25,6 +28,20 @@ class RoomType:
     SHOP = 'shop'
     PENDING = 'pending'
 
+# 房间类型的整数编码，用于紧凑存储
+ROOM_TYPE_NAMES: List[str] = [
+    RoomType.PENDING,
+    RoomType.START,
+    RoomType.BATTLE,
+    RoomType.EVENT,
+    RoomType.REST,
+    RoomType.ELITES,
+    RoomType.BLESSING,
+    RoomType.BOSS,
+    RoomType.SHOP,
+]
+ROOM_TYPE_CODES: Dict[str, int] = {name: code for code, name in enumerate(ROOM_TYPE_NAMES)}
+
 class RoomWeights(NamedTuple):
     """房间类型权重配置"""
     battle: int = 2
@@ -0,0 +1,179 @@
+"""按设计约束筛选地图，在能判定的最早阶段放弃不合格的候选
+
+    constraints = MapConstraints(min_boss_distance=6, require_shop=True, max_leaves=8)
+    maps, stats = generate_constrained(config, constraints, count=100)
+    print(stats.summary())
+
+各阶段的检查：
+    base_map   合并只会缩短距离，单元格到起点的最远距离不足时 Boss 距离必然不足
+    merged     叶子集合在合并后确定：叶子数量上下限，商店/Boss 所需的叶子数量
+    distances  类型分配中完成 BFS 后：最远距离，以及最远处是否有可作 Boss 的叶子
+    typed      最终结果的精确检查
+"""
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from batch import derive_seed
+from map_generator import MapGenerator
+from map_data import MapData
+from config import RoomType, MapConfig, DEFAULT_CONFIG
+
+PHASES = ('base_map', 'merged', 'distances', 'typed')
+
+
+class ConstraintViolation(Exception):
+    """候选地图不满足约束"""
+
+    def __init__(self, phase: str, name: str) -> None:
+        super().__init__(f"{name} violated after {phase}")
+        self.phase = phase
+        self.name = name
+
+
+def _max_cell_distance(generator: MapGenerator) -> int:
+    """基础地图上各单元格到起点的最远边数"""
+    start = generator.start_pos
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        pos = queue.popleft()
+        for cell in generator.edge_index.linked_cells(pos):
+            if cell not in distances:
+                distances[cell] = distances[pos] + 1
+                queue.append(cell)
+    return max(distances.values())
+
+
+@dataclass
+class MapConstraints:
+    """地图需要满足的设计约束，未设置的项不检查"""
+    min_boss_distance: Optional[int] = None
+    require_shop: bool = False
+    require_rest: bool = False  # 主路径上有休息房间，即存在 Boss
+    min_leaves: Optional[int] = None
+    max_leaves: Optional[int] = None
+
+    @property
+    def needs_boss(self) -> bool:
+        return self.require_rest or self.min_boss_distance is not None
+
+    def check(self, generator: MapGenerator, phase: str) -> None:
+        """检查 phase 阶段能判定的约束，不满足时抛出 ConstraintViolation"""
+        getattr(self, f'_check_{phase}')(generator)
+
+    def _check_base_map(self, generator: MapGenerator) -> None:
+        if self.min_boss_distance is not None and \
+                _max_cell_distance(generator) < self.min_boss_distance:
+            raise ConstraintViolation('base_map', 'min_boss_distance')
+
+    def _check_merged(self, generator: MapGenerator) -> None:
+        leaves = generator.graph.leaves()
+        if self.min_leaves is not None and len(leaves) < self.min_leaves:
+            raise ConstraintViolation('merged', 'min_leaves')
+        if self.max_leaves is not None and len(leaves) > self.max_leaves:
+            raise ConstraintViolation('merged', 'max_leaves')
+        # 商店占用第一个待分配叶子，Boss 需要另一个
+        pending_leaves = sum(1 for room in leaves if room.color == RoomType.PENDING)
+        if self.require_shop and pending_leaves < 1:
+            raise ConstraintViolation('merged', 'require_shop')
+        if self.needs_boss and pending_leaves < 2:
+            raise ConstraintViolation('merged', 'require_boss')
+
+    def _check_distances(self, generator: MapGenerator) -> None:
+        if not self.needs_boss:
+            return
+        distances = generator.distance_to_start
+        longest = max(distances.values())
+        if self.min_boss_distance is not None and longest < self.min_boss_distance:
+            raise ConstraintViolation('distances', 'min_boss_distance')
+        if not any(distance == longest and room.color == RoomType.PENDING and generator.is_room_leaf(room)
+                   for room, distance in distances.items()):
+            raise ConstraintViolation('distances', 'require_boss')
+
+    def _check_typed(self, generator: MapGenerator) -> None:
+        colors = {room.color for room in generator.pending_room}
+        if self.require_shop and RoomType.SHOP not in colors:
+            raise ConstraintViolation('typed', 'require_shop')
+        boss = next((room for room in generator.pending_room if room.color == RoomType.BOSS), None)
+        if self.needs_boss and boss is None:
+            raise ConstraintViolation('typed', 'require_boss')
+        if boss is not None and self.min_boss_distance is not None and \
+                generator.distance_to_start[boss] < self.min_boss_distance:
+            raise ConstraintViolation('typed', 'min_boss_distance')
+        if self.require_rest and boss is not None and \
+                not any(room.color == RoomType.REST for room in generator.get_path_to_start(boss)):
+            raise ConstraintViolation('typed', 'require_rest')
+
+
+@dataclass
+class ConstraintStats:
+    """拒绝采样的统计"""
+    attempts: int = 0
+    accepted: int = 0
+    rejections: Dict[str, int] = field(default_factory=dict)  # 'phase:name' -> 次数
+    total_time: float = 0.0  # 秒
+    wasted_time: float = 0.0  # 被拒绝的候选所花的时间
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.attempts if self.attempts else 0.0
+
+    @property
+    def wasted_fraction(self) -> float:
+        return self.wasted_time / self.total_time if self.total_time else 0.0
+
+    def merge(self, other: 'ConstraintStats') -> 'ConstraintStats':
+        """将另一份统计累加到自身"""
+        self.attempts += other.attempts
+        self.accepted += other.accepted
+        for key, value in other.rejections.items():
+            self.rejections[key] = self.rejections.get(key, 0) + value
+        self.total_time += other.total_time
+        self.wasted_time += other.wasted_time
+        return self
+
+    def summary(self) -> str:
+        lines = [f'{self.accepted}/{self.attempts} accepted ({self.acceptance_rate:.1%}), '
+                 f'{self.wasted_time * 1e3:.1f}ms of {self.total_time * 1e3:.1f}ms '
+                 f'spent on rejected candidates ({self.wasted_fraction:.1%})']
+        for key, value in sorted(self.rejections.items(), key=lambda item: -item[1]):
+            lines.append(f'  {key:<32} {value:8d}')
+        return '\n'.join(lines)
+
+
+def generate_candidate(config: MapConfig, constraints: MapConstraints, seed: int) -> MapData:
+    """生成一张候选地图，不满足约束时抛出 ConstraintViolation"""
+    generator = MapGenerator(config, random.Random(seed))
+    generator.constraints = constraints
+    generator.generate()
+    return generator.to_map_data(seed)
+
+
+def generate_constrained(config: MapConfig = DEFAULT_CONFIG,
+                         constraints: Optional[MapConstraints] = None,
+                         count: int = 1, seed: int = 0,
+                         max_attempts: Optional[int] = None) -> Tuple[List[MapData], ConstraintStats]:
+    """用拒绝采样生成 count 张满足约束的地图
+
+    第 i 次尝试使用 derive_seed(seed, i)，结果可复现。
+    达到 max_attempts 时返回已接受的地图，数量可能少于 count。
+    constraints 为 None 时不检查任何约束。
+    """
+    if constraints is None:
+        constraints = MapConstraints()
+    maps: List[MapData] = []
+    stats = ConstraintStats()
+    while len(maps) < count and (max_attempts is None or stats.attempts < max_attempts):
+        start = time.perf_counter()
+        try:
+            maps.append(generate_candidate(config, constraints, derive_seed(seed, stats.attempts)))
+            stats.accepted += 1
+        except ConstraintViolation as e:
+            key = f'{e.phase}:{e.name}'
+            stats.rejections[key] = stats.rejections.get(key, 0) + 1
+            stats.wasted_time += time.perf_counter() - start
+        stats.attempts += 1
+        stats.total_time += time.perf_counter() - start
+    return maps, stats
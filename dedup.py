@@ -0,0 +1,143 @@
+"""地图的规范结构哈希与流式去重
+
+规范形式由每个单元格的房间类型、与右侧/下方单元格是否属于同一房间、是否有边组成，
+不依赖房间编号和存储顺序。对网格的 8 种旋转与翻转分别编码后取字典序最小者，
+因此互为旋转或镜像的地图得到相同的哈希。
+"""
+import hashlib
+import struct
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+from structures import BloomFilter
+
+EMPTY_TYPE = 0x0F
+
+# 方向下标，顺序与 models.DIRECTIONS 相同：左、右、上、下
+_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+# 每个对称变换下新网格的单元格：(原单元格下标, 新右侧对应的原方向, 新下方对应的原方向)，无邻居时方向为-1
+SymmetryTable = Tuple[int, int, Tuple[Tuple[int, int, int], ...]]
+
+
+@lru_cache(maxsize=None)
+def _symmetries(width: int, height: int) -> Tuple[SymmetryTable, ...]:
+    """生成 8 种对称变换的查找表，返回 (新宽度, 新高度, 单元格表) 的元组"""
+    tables = []
+    for transpose in (False, True):
+        new_width, new_height = (height, width) if transpose else (width, height)
+        for flip_x in (False, True):
+            for flip_y in (False, True):
+                def source(x: int, y: int) -> Tuple[int, int]:
+                    x = new_width - 1 - x if flip_x else x
+                    y = new_height - 1 - y if flip_y else y
+                    return (y, x) if transpose else (x, y)
+
+                def direction(origin: Tuple[int, int], x: int, y: int) -> int:
+                    if not (0 <= x < new_width and 0 <= y < new_height):
+                        return -1
+                    target = source(x, y)
+                    return _OFFSETS.index((target[0] - origin[0], target[1] - origin[1]))
+
+                cells = []
+                for y in range(new_height):
+                    for x in range(new_width):
+                        origin = source(x, y)
+                        cells.append((origin[1] * width + origin[0],
+                                      direction(origin, x + 1, y), direction(origin, x, y + 1)))
+                tables.append((new_width, new_height, tuple(cells)))
+    return tuple(tables)
+
+
+def _cell_links(data: Any) -> Tuple[List[int], List[int], List[int]]:
+    """每个单元格的房间类型，以及四个方向上同房间、有边的位掩码"""
+    if not hasattr(data, 'cell_rooms'):
+        data = data.to_map_data()
+    width, height = data.width, data.height
+    rooms = data.cell_rooms()
+    edges = data.edges
+    types = [EMPTY_TYPE if room < 0 else data.room_types[room] for room in rooms]
+    same = [0] * (width * height)
+    linked = [0] * (width * height)
+    for index in range(width * height):
+        x, y = index % width, index // width
+        bits = (edges[index >> 2] >> ((index & 3) * 2)) & 3
+        for direction, neighbor, has_edge in ((1, index + 1, bits & 1), (3, index + width, bits & 2)):
+            if (direction == 1 and x + 1 >= width) or (direction == 3 and y + 1 >= height):
+                continue
+            opposite = direction - 1
+            if rooms[index] >= 0 and rooms[index] == rooms[neighbor]:
+                same[index] |= 1 << direction
+                same[neighbor] |= 1 << opposite
+            if has_edge:
+                linked[index] |= 1 << direction
+                linked[neighbor] |= 1 << opposite
+    return types, same, linked
+
+
+def canonical_key(data: Any, include_types: bool = True) -> bytes:
+    """计算地图在 8 种对称变换下字典序最小的结构编码
+
+    data 可以是 MapData 或 archive.MapView；include_types 为 False 时只比较布局。
+    """
+    types, same, linked = _cell_links(data)
+    if not include_types:
+        types = [0] * len(types)
+    best: Optional[bytes] = None
+    for new_width, new_height, cells in _symmetries(data.width, data.height):
+        encoded = bytearray(struct.pack('<HH', new_width, new_height))
+        for origin, right, down in cells:
+            code = types[origin] << 4
+            if right >= 0:
+                code |= ((same[origin] >> right) & 1) << 3 | ((linked[origin] >> right) & 1) << 2
+            if down >= 0:
+                code |= ((same[origin] >> down) & 1) << 1 | (linked[origin] >> down) & 1
+            encoded.append(code)
+        if best is None or encoded < best:
+            best = bytes(encoded)
+    assert best is not None
+    return best
+
+
+def canonical_hash(data: Any, include_types: bool = True) -> int:
+    """规范结构编码的 64 位哈希"""
+    digest = hashlib.blake2b(canonical_key(data, include_types), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class Deduplicator:
+    """按规范哈希过滤重复地图
+
+    capacity 为 None 时使用精确的哈希集合；给出 capacity 时使用布隆过滤器，
+    内存固定，但会以约 error_rate 的概率把新地图误判为重复。
+    """
+
+    def __init__(self, capacity: Optional[int] = None, error_rate: float = 1e-6,
+                 include_types: bool = True) -> None:
+        self.include_types = include_types
+        self.seen: Any = set() if capacity is None else BloomFilter(capacity, error_rate)
+        self.checked = 0
+        self.duplicates = 0
+
+    def add(self, data: Any) -> bool:
+        """记录地图，返回它是否为首次出现"""
+        value = canonical_hash(data, self.include_types)
+        self.checked += 1
+        if isinstance(self.seen, set):
+            duplicate = value in self.seen
+            self.seen.add(value)
+        else:
+            duplicate = self.seen.add(value)
+        self.duplicates += duplicate
+        return not duplicate
+
+    def stats(self) -> dict:
+        return {'checked': self.checked, 'unique': self.checked - self.duplicates,
+                'duplicates': self.duplicates}
+
+
+def unique_maps(maps: Iterable[Any], deduplicator: Optional[Deduplicator] = None) -> Iterator[Any]:
+    """流式过滤，只产出首次出现的地图"""
+    deduplicator = deduplicator if deduplicator is not None else Deduplicator()
+    for data in maps:
+        if deduplicator.add(data):
+            yield data
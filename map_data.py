@@ -0,0 +1,195 @@
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from models import Room, Edge
+from config import ROOM_TYPE_CODES, ROOM_TYPE_NAMES, RoomType
+
+# 房间标记位
+FLAG_LEAF = 1
+FLAG_MAIN_PATH = 2
+
+# 每个单元格在边位图中占两位：向右、向下
+EDGE_RIGHT = 1
+EDGE_DOWN = 2
+
+
+def describe_room(leaf: bool, distance: int, main_path: bool) -> str:
+    """按生成器的格式拼接房间调试描述"""
+    description = 'leaf\n' if leaf else ''
+    if distance >= 0:
+        description += f'{distance}\n'
+    if main_path:
+        description += 'main_path\n'
+    return description
+
+
+@dataclass(slots=True)
+class MapData:
+    """以结构数组形式紧凑存储的地图
+
+    房间按下标存放在若干并列数组中，房间类型使用 config.ROOM_TYPE_CODES 编码，
+    边以每个单元格两位（向右、向下）的位图保存。
+    """
+    width: int
+    height: int
+    room_x: array
+    room_y: array
+    room_w: array
+    room_h: array
+    room_types: bytearray
+    distances: array
+    flags: bytearray
+    edges: bytearray
+    seed: Optional[int] = None
+
+    @classmethod
+    def empty(cls, width: int, height: int, seed: Optional[int] = None) -> 'MapData':
+        """创建不含房间和边的地图"""
+        return cls(width, height,
+                   array('H'), array('H'), array('B'), array('B'),
+                   bytearray(), array('h'), bytearray(),
+                   bytearray((width * height * 2 + 7) // 8), seed)
+
+    @classmethod
+    def from_rooms(cls, width: int, height: int,
+                   rooms: Iterable[Room], edges: Iterable[Edge],
+                   seed: Optional[int] = None) -> 'MapData':
+        """从 Room/Edge 对象转换，距离与标记从房间调试描述中解析
+
+        只用于没有生成器可查询的房间列表，生成器的结果应使用 from_generator。
+        """
+        data = cls.empty(width, height, seed)
+        for room in rooms:
+            distance, flags = -1, 0
+            for token in room.description.split():
+                if token == 'leaf':
+                    flags |= FLAG_LEAF
+                elif token == 'main_path':
+                    flags |= FLAG_MAIN_PATH
+                elif token.isdigit():
+                    distance = int(token)
+            data.add_room(room.topLeft, room.size, ROOM_TYPE_CODES[room.color], distance, flags)
+        data.add_edges(edges)
+        return data
+
+    @classmethod
+    def from_generator(cls, generator: Any, seed: Optional[int] = None) -> 'MapData':
+        """从 MapGenerator 转换，距离、叶子与主路径直接查询生成器
+
+        尚未分配类型时距离为-1且不设标记。
+        """
+        data = cls.empty(generator.width, generator.height, seed)
+        distances: Dict[Room, int] = generator.distance_to_start
+        main_path = set()
+        if distances:
+            boss = next((room for room in generator.pending_room if room.color == RoomType.BOSS), None)
+            if boss is not None:
+                main_path = set(generator.get_path_to_start(boss))
+        for room in generator.pending_room:
+            flags = 0
+            if distances and generator.graph.is_leaf(room):
+                flags |= FLAG_LEAF
+            if room in main_path:
+                flags |= FLAG_MAIN_PATH
+            data.add_room(room.topLeft, room.size, ROOM_TYPE_CODES[room.color],
+                          distances.get(room, -1), flags)
+        data.add_edges(generator.edges)
+        return data
+
+    @property
+    def room_count(self) -> int:
+        return len(self.room_types)
+
+    def add_room(self, top_left: Tuple[int, int], size: Tuple[int, int],
+                 type_code: int, distance: int = -1, flags: int = 0) -> int:
+        """追加一个房间，返回其下标"""
+        self.room_x.append(top_left[0])
+        self.room_y.append(top_left[1])
+        self.room_w.append(size[0])
+        self.room_h.append(size[1])
+        self.room_types.append(type_code)
+        self.distances.append(distance)
+        self.flags.append(flags)
+        return len(self.room_types) - 1
+
+    def set_edge(self, pos: Tuple[int, int], direction: int) -> None:
+        """在位图中记录从 pos 出发向右或向下的边"""
+        bit = ((pos[1] - 1) * self.width + (pos[0] - 1)) * 2 + (direction >> 1)
+        self.edges[bit >> 3] |= 1 << (bit & 7)
+
+    def add_edges(self, edges: Iterable[Edge]) -> None:
+        """记录 Edge 对象表示的边"""
+        for edge in edges:
+            self.set_edge(edge.start, EDGE_RIGHT if edge.direction == 'Horizontal' else EDGE_DOWN)
+
+    def edge_bits(self, pos: Tuple[int, int]) -> int:
+        """获取单元格的边位（EDGE_RIGHT | EDGE_DOWN）"""
+        bit = ((pos[1] - 1) * self.width + (pos[0] - 1)) * 2
+        return (self.edges[bit >> 3] >> (bit & 7)) & 3
+
+    def cell_rooms(self) -> array:
+        """构建单元格到房间下标的索引，空单元格为-1"""
+        cells = array('i', [-1]) * (self.width * self.height)
+        for i in range(self.room_count):
+            for y in range(self.room_y[i], self.room_y[i] + self.room_h[i]):
+                row = (y - 1) * self.width
+                for x in range(self.room_x[i], self.room_x[i] + self.room_w[i]):
+                    cells[row + x - 1] = i
+        return cells
+
+    def main_path(self) -> List[int]:
+        """按距离排序返回主路径上的房间下标"""
+        path = [i for i in range(self.room_count) if self.flags[i] & FLAG_MAIN_PATH]
+        return sorted(path, key=lambda i: self.distances[i])
+
+    def type_name(self, index: int) -> str:
+        return ROOM_TYPE_NAMES[self.room_types[index]]
+
+    def to_rooms(self) -> List[Room]:
+        """转换为 Room 对象列表"""
+        return [
+            Room((self.room_x[i], self.room_y[i]), (self.room_w[i], self.room_h[i]),
+                 ROOM_TYPE_NAMES[self.room_types[i]],
+                 describe_room(bool(self.flags[i] & FLAG_LEAF), self.distances[i],
+                               bool(self.flags[i] & FLAG_MAIN_PATH)))
+            for i in range(self.room_count)
+        ]
+
+    def to_edges(self) -> List[Edge]:
+        """转换为 Edge 对象列表"""
+        edges = []
+        for y in range(1, self.height + 1):
+            for x in range(1, self.width + 1):
+                bits = self.edge_bits((x, y))
+                if bits & EDGE_RIGHT:
+                    edges.append(Edge((x, y), 'Horizontal'))
+                if bits & EDGE_DOWN:
+                    edges.append(Edge((x, y), 'Vertical'))
+        return edges
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可 JSON 序列化的字典，房间为 [x, y, w, h, 类型, 距离, 标记]"""
+        return {
+            'seed': self.seed,
+            'width': self.width,
+            'height': self.height,
+            'rooms': [[self.room_x[i], self.room_y[i], self.room_w[i], self.room_h[i],
+                       ROOM_TYPE_NAMES[self.room_types[i]], self.distances[i], self.flags[i]]
+                      for i in range(self.room_count)],
+            'edges': self.edges.hex(),
+        }
+
+    @classmethod
+    def from_dict(cls, obj: Dict[str, Any]) -> 'MapData':
+        """从 to_dict 的结果还原"""
+        data = cls.empty(obj['width'], obj['height'], obj.get('seed'))
+        for x, y, w, h, type_name, distance, flags in obj['rooms']:
+            data.add_room((x, y), (w, h), ROOM_TYPE_CODES[type_name], distance, flags)
+        data.edges[:] = bytes.fromhex(obj['edges'])
+        return data
+
+    def nbytes(self) -> int:
+        """数组负载的字节数（不含对象头）"""
+        return sum(len(a) * a.itemsize for a in
+                   (self.room_x, self.room_y, self.room_w, self.room_h, self.distances)) + \
+            len(self.room_types) + len(self.flags) + len(self.edges)
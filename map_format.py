@@ -0,0 +1,253 @@
+"""地图的持久化格式
+
+二进制文件布局（小端序）::
+
+    文件头    FILE_HEADER: 魔数 b'MAPG'、版本、地图数量、索引偏移
+    记录区    逐张地图的记录，见 encode_map
+    索引区    count + 1 个 u64 偏移，第 i 张地图位于 [offsets[i], offsets[i+1])
+    种子表    u64 条目数 n，n 个升序 u64 种子，n 个对应的 u64 下标
+
+索引位于文件末尾，因此可以边生成边写入；读取时通过 mmap 按下标直接定位记录，
+无需解析其余地图。JSON 形式保存 MapData.to_dict 的结果，便于人工查看。
+"""
+import bisect
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Any, BinaryIO, Iterable, Iterator, List, Sequence, Tuple, Union
+from map_data import MapData
+
+MAGIC = b'MAPG'
+FORMAT_VERSION = 1
+JSON_VERSION = 1
+
+FILE_HEADER = struct.Struct('<4sHHQQ')
+RECORD_HEADER = struct.Struct('<HHIBQ')
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+IntSequence = Union[memoryview, Sequence[int]]
+
+# 小端序机器上可以直接把映射转换为数值视图
+ZERO_COPY = sys.byteorder == 'little'
+
+
+def _le_bytes(values: array) -> bytes:
+    """以小端序导出数组内容"""
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _le_array(typecode: str, buf: Buffer) -> array:
+    """从小端序字节构建数组"""
+    values = array(typecode)
+    values.frombytes(buf)
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values.byteswap()
+    return values
+
+
+def _int_view(buf: memoryview, typecode: str) -> IntSequence:
+    """将小端序字节转换为整数序列，小端序机器上不复制"""
+    return buf.cast(typecode) if ZERO_COPY else _le_array(typecode, buf)
+
+
+def encode_map(data: MapData) -> bytes:
+    """编码单张地图
+
+    记录头包含宽、高、房间数和种子，随后依次为 room_x、room_y（u16）、
+    room_w、room_h、room_types（u8）、distances（i16）、flags（u8）与边位图。
+    """
+    header = RECORD_HEADER.pack(data.width, data.height, data.room_count,
+                                data.seed is not None, data.seed or 0)
+    return b''.join((
+        header,
+        _le_bytes(data.room_x), _le_bytes(data.room_y),
+        data.room_w.tobytes(), data.room_h.tobytes(), bytes(data.room_types),
+        _le_bytes(data.distances), bytes(data.flags), bytes(data.edges),
+    ))
+
+
+def decode_map(buf: Buffer, offset: int = 0) -> MapData:
+    """从 buf 的 offset 处解码单张地图"""
+    width, height, count, has_seed, seed = RECORD_HEADER.unpack_from(buf, offset)
+    view = memoryview(buf)
+    pos = offset + RECORD_HEADER.size
+
+    def take(size: int) -> memoryview:
+        nonlocal pos
+        pos += size
+        return view[pos - size:pos]
+
+    room_x = _le_array('H', take(count * 2))
+    room_y = _le_array('H', take(count * 2))
+    room_w = _le_array('B', take(count))
+    room_h = _le_array('B', take(count))
+    room_types = bytearray(take(count))
+    distances = _le_array('h', take(count * 2))
+    flags = bytearray(take(count))
+    edges = bytearray(take((width * height * 2 + 7) // 8))
+    return MapData(width, height, room_x, room_y, room_w, room_h,
+                   room_types, distances, flags, edges, seed if has_seed else None)
+
+
+class MapWriter:
+    """以流式方式写入二进制地图文件"""
+
+    def __init__(self, path: str) -> None:
+        self.file: BinaryIO = open(path, 'wb')
+        self.offsets = array('Q')
+        self.seeds = array('Q')
+        self.seed_indices = array('Q')
+        self.file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0, 0))
+
+    def write(self, data: MapData) -> None:
+        if data.seed is not None:
+            self.seeds.append(data.seed)
+            self.seed_indices.append(len(self.offsets))
+        self.offsets.append(self.file.tell())
+        self.file.write(encode_map(data))
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        count = len(self.offsets)
+        index_offset = self.file.tell()
+        self.offsets.append(index_offset)
+        self.file.write(_le_bytes(self.offsets))
+        order = sorted(range(len(self.seeds)), key=self.seeds.__getitem__)
+        self.file.write(struct.pack('<Q', len(order)))
+        self.file.write(_le_bytes(array('Q', (self.seeds[i] for i in order))))
+        self.file.write(_le_bytes(array('Q', (self.seed_indices[i] for i in order))))
+        self.file.seek(0)
+        self.file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, 0, count, index_offset))
+        self.file.close()
+
+    def __enter__(self) -> 'MapWriter':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def open_mmap(path: str) -> Tuple[mmap.mmap, int, int]:
+    """映射地图文件并校验文件头，返回 (映射, 地图数量, 索引偏移)"""
+    with open(path, 'rb') as file:
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, _, count, index_offset = FILE_HEADER.unpack_from(mm, 0)
+    if magic != MAGIC:
+        mm.close()
+        raise ValueError(f"Not a map file: {path}")
+    if version != FORMAT_VERSION:
+        mm.close()
+        raise ValueError(f"Unsupported map file version: {version}")
+    return mm, count, index_offset
+
+
+class MapFile:
+    """通过 mmap 按下标或种子随机读取二进制地图文件
+
+    索引与种子表是映射上的视图，file[i] 与 by_seed 只解码所需的那条记录。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.mm, self.count, index_offset = open_mmap(path)
+        self.buf = memoryview(self.mm)
+        index_end = index_offset + (self.count + 1) * 8
+        self.offsets = _int_view(self.buf[index_offset:index_end], 'Q')
+        (seeded,) = struct.unpack_from('<Q', self.mm, index_end)
+        start = index_end + 8
+        self.seeds = _int_view(self.buf[start:start + seeded * 8], 'Q')
+        start += seeded * 8
+        self.seed_indices = _int_view(self.buf[start:start + seeded * 8], 'Q')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def record_offset(self, index: int) -> int:
+        """返回第 index 张地图记录的偏移，支持负下标"""
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.offsets[index]
+
+    def __getitem__(self, index: int) -> MapData:
+        return decode_map(self.buf, self.record_offset(index))
+
+    def __iter__(self) -> Iterator[MapData]:
+        for index in range(self.count):
+            yield self[index]
+
+    def index_of_seed(self, seed: int) -> int:
+        """返回种子对应的地图下标，不存在时抛出 KeyError"""
+        i = bisect.bisect_left(self.seeds, seed)
+        if i == len(self.seeds) or self.seeds[i] != seed:
+            raise KeyError(seed)
+        return self.seed_indices[i]
+
+    def by_seed(self, seed: int) -> MapData:
+        """按种子获取地图"""
+        return self[self.index_of_seed(seed)]
+
+    def close(self) -> None:
+        for view in (self.offsets, self.seeds, self.seed_indices, self.buf):
+            if isinstance(view, memoryview):
+                view.release()
+        try:
+            self.mm.close()
+        except BufferError:
+            # 仍有视图引用映射时，由垃圾回收负责关闭
+            pass
+
+    def __enter__(self) -> 'MapFile':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def save_maps(path: str, maps: Iterable[MapData]) -> int:
+    """将地图写入二进制文件，返回写入数量"""
+    with MapWriter(path) as writer:
+        for data in maps:
+            writer.write(data)
+        count = len(writer.offsets)
+    return count
+
+
+def load_maps(path: str) -> MapFile:
+    """打开二进制地图文件，返回可按下标读取的 MapFile"""
+    return MapFile(path)
+
+
+def save_map(path: str, data: MapData) -> None:
+    """保存单张地图"""
+    save_maps(path, [data])
+
+
+def load_map(path: str, index: int = 0) -> MapData:
+    """读取文件中的单张地图"""
+    with MapFile(path) as map_file:
+        return map_file[index]
+
+
+def save_json(path: str, maps: Iterable[MapData]) -> None:
+    """以 JSON 形式保存地图"""
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'format': 'map-generator', 'version': JSON_VERSION,
+                   'maps': [data.to_dict() for data in maps]}, file)
+
+
+def load_json(path: str) -> List[MapData]:
+    """读取 save_json 保存的地图"""
+    with open(path, encoding='utf-8') as file:
+        obj = json.load(file)
+    if obj.get('format') != 'map-generator':
+        raise ValueError(f"Not a map JSON file: {path}")
+    if obj.get('version', 0) > JSON_VERSION:
+        raise ValueError(f"Unsupported map file version: {obj['version']}")
+    return [MapData.from_dict(item) for item in obj['maps']]
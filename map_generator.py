@@ -1,10 +1,14 @@
 import random
-from typing import Optional, List, Set, Dict, Tuple, cast
-from PIL import Image
-from models import Room, Edge
-from renderer import MapRenderer
+from typing import TYPE_CHECKING, Any, Optional, List, Set, Dict, Tuple, cast
+from models import Room, Edge, RoomGrid, EdgeIndex, LayoutCheckpoint
+from structures import IndexedSet
+from room_graph import RoomGraph
+from map_data import MapData
 from config import RoomType, MapConfig, DEFAULT_CONFIG
 
+if TYPE_CHECKING:
+    from PIL import Image
+
 
 # 颜色映射
 COLOR_MAP = {
@@ -24,35 +28,48 @@ class Map:
         self.height = height
         self.rooms: List[Room] = []
         self.edges: List[Edge] = []
+        self.grid = RoomGrid(width, height)
 
     def add_room(self, room: Room) -> None:
         self.rooms.append(room)
+        self.grid.place(room)
     
     def add_edge(self, edge: Edge) -> None:
         self.edges.append(edge)
     
     def get_room(self, pos: Tuple[int, int]) -> Optional[Room]:
-        for room in self.rooms:
-            if pos[0] >= room.topLeft[0] and pos[0] < room.topLeft[0] + room.size[0] and \
-               pos[1] >= room.topLeft[1] and pos[1] < room.topLeft[1] + room.size[1]:
-                return room
-        return None
+        return self.grid.get(pos)
 
 class MapGenerator:
     """地图生成器类，负责生成随机地图"""
     
-    def __init__(self, config: MapConfig = DEFAULT_CONFIG) -> None:
+    def __init__(self, config: MapConfig = DEFAULT_CONFIG, 
+                 rng: Optional[random.Random] = None) -> None:
         self.config = config
+        # 未指定随机数生成器时沿用全局 random 模块
+        self.rng = rng if rng is not None else cast(random.Random, random)
         self.width = config.grid_width
         self.height = config.grid_height
         self.unavailable_pos: Set[Tuple[int, int]] = set()
-        self.available_pos: Set[Tuple[int, int]] = set()
+        self.available_pos: IndexedSet[Tuple[int, int]] = IndexedSet()
+        # 与已连接位置相邻的可用位置，随位置状态变化增量维护
+        self.frontier_pos: IndexedSet[Tuple[int, int]] = IndexedSet()
         self.pending_pos: Set[Tuple[int, int]] = set()
-        self.pending_room: List[Room] = []
+        self.connected_pos: Set[Tuple[int, int]] = set()
+        self.pending_room: IndexedSet[Room] = IndexedSet()
+        self.grid = RoomGrid(self.width, self.height)
         self.room_types: Dict[Tuple[int, int], str] = {}
         self.edges: List[Edge] = []
+        self.edge_index = EdgeIndex(self.width, self.height)
         self.distance_to_start: Dict[Room, int] = {}
-        self.distance_to_start_path: Dict[Room, List[Room]] = {}
+        self.start_pos: Optional[Tuple[int, int]] = None
+        self.start_room: Optional[Room] = None
+        self._graph: Optional[RoomGraph] = None
+        # 上次渲染使用的渲染器及各房间当时的 (类型, 描述)，供 rerender 增量重绘
+        self._renderer: Any = None
+        self._rendered: Dict[Room, Tuple[str, str]] = {}
+        # 可选的约束条件（如 constraints.MapConstraints），在各阶段结束时检查
+        self.constraints: Any = None
         
         # 初始化所有位置为不可用
         for x in range(1, self.width + 1):
@@ -64,16 +81,28 @@ class MapGenerator:
         if pos in self.unavailable_pos:
             self.available_pos.add(pos)
             self.unavailable_pos.remove(pos)
+            if any((pos[0] + dx, pos[1] + dy) in self.connected_pos 
+                   for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]):
+                self.frontier_pos.add(pos)
     
     def set_pending_pos(self, pos: Tuple[int, int]) -> None:
         """将位置标记为待处理，并更新其相邻位置为可用"""
         self.pending_pos.add(pos)
         self.available_pos.discard(pos)
+        self.frontier_pos.discard(pos)
         self.unavailable_pos.discard(pos)
         
         # 更新相邻位置为可用
         for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
             self.set_available_pos((pos[0] + dx, pos[1] + dy))
+    
+    def set_connected_pos(self, pos: Tuple[int, int]) -> None:
+        """将位置标记为已连接，其相邻的可用位置加入边界"""
+        self.connected_pos.add(pos)
+        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            neighbor = (pos[0] + dx, pos[1] + dy)
+            if neighbor in self.available_pos:
+                self.frontier_pos.add(neighbor)
 
     def get_neighboring_pending_pos(self, pos: Tuple[int, int]) -> List[Tuple[int, int]]:
         """获取给定位置的所有待处理相邻位置"""
@@ -86,47 +115,55 @@ class MapGenerator:
 
     def is_room_connected(self, roomA: Room, roomB: Room) -> bool:
         """检查两个房间是否通过边连接"""
-        if not self.check_adjacent(roomA, roomB):
-            return False
-            
-        for edge in self.edges:
-            edge_start = edge.start
-            edge_end = (
-                edge_start[0] + (1 if edge.direction == 'Horizontal' else 0),
-                edge_start[1] + (1 if edge.direction == 'Vertical' else 0)
-            )
-            if (self.get_room(edge_start) == roomA and self.get_room(edge_end) == roomB) or \
-               (self.get_room(edge_start) == roomB and self.get_room(edge_end) == roomA):
-                return True
+        for x in range(roomA.topLeft[0], roomA.topLeft[0] + roomA.size[0]):
+            for y in range(roomA.topLeft[1], roomA.topLeft[1] + roomA.size[1]):
+                for cell in self.edge_index.linked_cells((x, y)):
+                    if self.get_room(cell) is roomB:
+                        return True
         return False
 
     def get_room(self, pos: Tuple[int, int]) -> Optional[Room]:
         """获取给定位置的房间"""
-        for room in self.pending_room:
-            if (pos[0] >= room.topLeft[0] and 
-                pos[0] < room.topLeft[0] + room.size[0] and 
-                pos[1] >= room.topLeft[1] and 
-                pos[1] < room.topLeft[1] + room.size[1]):
-                return room
-        return None
+        return self.grid.get(pos)
+
+    def add_edge(self, edge: Edge) -> None:
+        """添加边并更新邻接索引"""
+        self.edges.append(edge)
+        self.edge_index.add(edge)
+
+    def add_pending_room(self, room: Room) -> None:
+        """添加房间并更新网格索引"""
+        self.pending_room.add(room)
+        self.grid.place(room)
+
+    def remove_pending_room(self, room: Room) -> None:
+        """移除房间并清除网格索引"""
+        self.pending_room.remove(room)
+        self.grid.remove(room)
+
+    @property
+    def graph(self) -> RoomGraph:
+        """房间连通图，首次使用时构建，合并房间时由 _merge 局部失效"""
+        if self._graph is None:
+            self._graph = RoomGraph(self.pending_room, self.get_neighboring_pending_room)
+        return self._graph
 
     def get_neighboring_pending_room(self, room: Room) -> List[Room]:
         """获取给定房间的所有相邻房间"""
-        neighbors: Set[Room] = set()
+        neighbors: List[Room] = []
         for x in range(room.topLeft[0], room.topLeft[0] + room.size[0]):
             for y in range(room.topLeft[1], room.topLeft[1] + room.size[1]):
-                for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                    neighbor = self.get_room((x + dx, y + dy))
+                for cell in self.edge_index.linked_cells((x, y)):
+                    neighbor = self.get_room(cell)
                     if (neighbor and 
-                        neighbor != room and 
-                        neighbor not in neighbors and
-                        self.is_room_connected(room, neighbor)):
-                        neighbors.add(neighbor)
-        return list(neighbors)
+                        neighbor is not room and 
+                        not any(n is neighbor for n in neighbors)):
+                        neighbors.append(neighbor)
+        return neighbors
     
     def is_room_leaf(self, room: Room) -> bool:
         """检查房间是否为叶子节点（只有一个相邻房间）"""
-        return len(self.get_neighboring_pending_room(room)) == 1
+        return self.graph.is_leaf(room)
     
     def check_adjacent(self, a: Room, b: Room) -> bool:
         """检查两个房间是否相邻"""
@@ -151,32 +188,27 @@ class MapGenerator:
     def generate_base_map(self) -> Tuple[Tuple[int, int], Set[Tuple[int, int]]]:
         """生成基础地图结构，返回起点位置和已连接位置集合"""
         # 随机选择起点位置
-        start_pos = (random.choice([1, self.width]), random.randint(1, self.height)) if random.random() < 0.5 \
-            else (random.randint(1, self.width), random.choice([1, self.height]))
+        start_pos = (self.rng.choice([1, self.width]), self.rng.randint(1, self.height)) if self.rng.random() < 0.5 \
+            else (self.rng.randint(1, self.width), self.rng.choice([1, self.height]))
+        self.start_pos = start_pos
         self.room_types[start_pos] = RoomType.START
         self.set_pending_pos(start_pos)
         
         # 用于追踪已连接的位置
-        connected_positions = {start_pos}
+        self.set_connected_pos(start_pos)
         start_room_connected = False
         
         while self.available_pos:
             # 优先选择与已连接位置相邻的可用位置
-            available_connected = [
-                pos for pos in self.available_pos 
-                if any((pos[0] + dx, pos[1] + dy) in connected_positions 
-                      for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)])
-            ]
-            
-            pos = random.choice(available_connected) if available_connected \
-                else random.choice(list(self.available_pos))
+            pos = self.frontier_pos.choice(self.rng) if self.frontier_pos \
+                else self.available_pos.choice(self.rng)
             
             self.set_pending_pos(pos)
             self.room_types[pos] = RoomType.PENDING
             
             # 获取已连接的邻居位置
             connected_neighbors = [n for n in self.get_neighboring_pending_pos(pos) 
-                                if n in connected_positions]
+                                if n in self.connected_pos]
             
             if connected_neighbors:
                 # 处理与起始房间的连接
@@ -191,31 +223,31 @@ class MapGenerator:
                 if not connected_neighbors: continue
                 
                 # 创建边连接
-                neighbor = random.choice(connected_neighbors)
+                neighbor = self.rng.choice(connected_neighbors)
                 if pos[0] == neighbor[0]:
                     edge_start = neighbor if neighbor[1] < pos[1] else pos
-                    self.edges.append(Edge(edge_start, 'Vertical'))
+                    self.add_edge(Edge(edge_start, 'Vertical'))
                 else:
                     edge_start = neighbor if neighbor[0] < pos[0] else pos
-                    self.edges.append(Edge(edge_start, 'Horizontal'))
+                    self.add_edge(Edge(edge_start, 'Horizontal'))
                 
-                connected_positions.add(pos)
+                self.set_connected_pos(pos)
         
-        return start_pos, connected_positions
+        return start_pos, self.connected_pos
 
     def merge_rooms(self) -> None:
         """合并相邻的房间"""
         # 创建初始房间
         for room_pos in self.pending_pos:
-            self.pending_room.append(Room(room_pos, (1, 1), self.room_types[room_pos]))
+            self.add_pending_room(Room(room_pos, (1, 1), self.room_types[room_pos]))
         
         # 尝试合并房间
         for _ in range(self.width * self.height // 2):
-            room = random.choice(self.pending_room)
-            neighbors = self.get_neighboring_pending_room(room)
+            room = self.pending_room.choice(self.rng)
+            neighbors = self.graph.neighbors(room)
             if not neighbors: continue
             
-            neighbor = random.choice(neighbors)
+            neighbor = self.rng.choice(neighbors)
             if room.color != neighbor.color or room.size != (1, 1) or neighbor.size != (1, 1):
                 continue
             
@@ -235,28 +267,47 @@ class MapGenerator:
                 room.size[0], room.size[1] + neighbor.size[1]
             )
             
-            new_room = Room(new_top_left, new_size, room.color)
-            
-            # 应用合并
-            self.pending_room.remove(room)
-            self.pending_room.remove(neighbor)
-            self.pending_room.append(new_room)
-            
-            # 检查是否形成叶子节点
-            if self.is_room_leaf(new_room):
-                self.pending_room.append(room)
-                self.pending_room.append(neighbor)
-                self.pending_room.remove(new_room)
+            # 会形成叶子节点时放弃合并
+            new_room = self._merge((room, neighbor), new_top_left, new_size)
+            if not new_room:
                 continue
             
             # 尝试进一步合并
-            if random.random() < self.config.merge_chance:
+            if self.rng.random() < self.config.merge_chance:
                 self._try_further_merge(new_room, same_row, same_col)
 
+    def _merged_room_is_leaf(self, members: Tuple[Room, ...], 
+                             top_left: Tuple[int, int], size: Tuple[int, int]) -> bool:
+        """在不修改房间的情况下判断合并后的房间是否只有一个相邻房间"""
+        neighbors: List[Room] = []
+        for x in range(top_left[0], top_left[0] + size[0]):
+            for y in range(top_left[1], top_left[1] + size[1]):
+                for cell in self.edge_index.linked_cells((x, y)):
+                    neighbor = self.get_room(cell)
+                    if (neighbor and 
+                        not any(neighbor is m for m in members) and 
+                        not any(neighbor is n for n in neighbors)):
+                        neighbors.append(neighbor)
+                        if len(neighbors) > 1:
+                            return False
+        return len(neighbors) == 1
+
+    def _merge(self, members: Tuple[Room, ...], 
+               top_left: Tuple[int, int], size: Tuple[int, int]) -> Optional[Room]:
+        """合并房间，合并结果会成为叶子节点时不做任何修改并返回None"""
+        if self._merged_room_is_leaf(members, top_left, size):
+            return None
+        self.graph.merge(members)
+        for member in members:
+            self.remove_pending_room(member)
+        merged = Room(top_left, size, members[0].color)
+        self.add_pending_room(merged)
+        return merged
+
     def _try_further_merge(self, room: Room, same_row: bool, same_col: bool) -> None:
         """尝试进一步合并房间"""
-        merger_neighbors = self.get_neighboring_pending_room(room)
-        if random.random() < 0.5:
+        merger_neighbors = self.graph.neighbors(room)
+        if self.rng.random() < 0.5:
             self._try_merge_1x3(room, merger_neighbors, same_row, same_col)
         else:
             self._try_merge_2x2(room, same_row, same_col)
@@ -282,16 +333,7 @@ class MapGenerator:
                 room.size[0], room.size[1] + neighbor.size[1]
             )
             
-            merger_room = Room(merger_top_left, merger_size, room.color)
-            
-            self.pending_room.remove(neighbor)
-            self.pending_room.remove(room)
-            self.pending_room.append(merger_room)
-            
-            if self.is_room_leaf(merger_room):
-                self.pending_room.append(neighbor)
-                self.pending_room.append(room)
-                self.pending_room.remove(merger_room)
+            self._merge((room, neighbor), merger_top_left, merger_size)
             break
 
     def _try_merge_2x2(self, room: Room, same_row: bool, same_col: bool) -> None:
@@ -313,7 +355,7 @@ class MapGenerator:
         else:
             return
         
-        merger_neighbors = self.get_neighboring_pending_room(room)
+        merger_neighbors = self.graph.neighbors(room)
         for neighbor1, neighbor2 in neighbors_to_merge:
             if not self._can_merge_2x2(room, neighbor1, neighbor2, merger_neighbors):
                 continue
@@ -326,18 +368,7 @@ class MapGenerator:
                 min(neighbor1.topLeft[0], neighbor2.topLeft[0], room.topLeft[0]),
                 min(neighbor1.topLeft[1], neighbor2.topLeft[1], room.topLeft[1])
             )
-            merger_room = Room(merger_top_left, (2, 2), room.color)
-            
-            self.pending_room.remove(neighbor1)
-            self.pending_room.remove(neighbor2)
-            self.pending_room.remove(room)
-            self.pending_room.append(merger_room)
-            
-            if self.is_room_leaf(merger_room):
-                self.pending_room.append(neighbor1)
-                self.pending_room.append(neighbor2)
-                self.pending_room.append(room)
-                self.pending_room.remove(merger_room)
+            self._merge((room, neighbor1, neighbor2), merger_top_left, (2, 2))
             break
 
     def _can_merge_2x2(self, room: Room, neighbor1: Optional[Room], 
@@ -349,8 +380,8 @@ class MapGenerator:
         if not (neighbor1 in merger_neighbors or neighbor2 in merger_neighbors):
             return False
             
-        if not (neighbor1 in merger_neighbors and neighbor2 in self.get_neighboring_pending_room(neighbor1) or
-                neighbor2 in merger_neighbors and neighbor1 in self.get_neighboring_pending_room(neighbor2)):
+        if not (neighbor1 in merger_neighbors and neighbor2 in self.graph.neighbors(neighbor1) or
+                neighbor2 in merger_neighbors and neighbor1 in self.graph.neighbors(neighbor2)):
             return False
             
         if not (neighbor1.color == neighbor2.color == room.color):
@@ -382,6 +413,7 @@ class MapGenerator:
         
         # 获取最远距离
         longest_distance = max(self.distance_to_start.values())
+        self.check_constraints('distances')
         
         # 分离叶子和非叶子房间
         pending_leaf_rooms = []
@@ -394,8 +426,8 @@ class MapGenerator:
             else:
                 pending_non_leaf_rooms.append(room)
         
-        random.shuffle(pending_leaf_rooms)
-        random.shuffle(pending_non_leaf_rooms)
+        self.rng.shuffle(pending_leaf_rooms)
+        self.rng.shuffle(pending_non_leaf_rooms)
         
         # 分配商店
         if pending_leaf_rooms:
@@ -410,7 +442,7 @@ class MapGenerator:
                 room.color = RoomType.BOSS
                 boss_room = room
             else:
-                room.color = random.choice([RoomType.EVENT, RoomType.BLESSING])
+                room.color = self.rng.choice([RoomType.EVENT, RoomType.BLESSING])
         
         # 分配休息房间
         if boss_room:
@@ -425,18 +457,24 @@ class MapGenerator:
             if room in self.distance_to_start and self.distance_to_start[room] < 3:
                 room.color = RoomType.BATTLE
             else:
-                room.color = random.choice(non_leaf_choices)
+                room.color = self.rng.choice(non_leaf_choices)
                 if room.color == RoomType.ELITES:
                     non_leaf_choices.append(RoomType.BATTLE)
         
         # 标记主路径
         if boss_room:
-            for room in self.distance_to_start_path[boss_room]:
+            for room in self.get_path_to_start(boss_room):
                 room.description += 'main_path\n'
 
+    def get_path_to_start(self, room: Room) -> List[Room]:
+        """获取从起点到给定房间的路径，不含该房间本身"""
+        if self.start_room is None:
+            return []
+        return self.graph.path(self.start_room, room)[:-1]
+
     def _assign_rest_room(self, boss_room: Room) -> None:
         """在主路径上分配休息房间"""
-        main_path = self.distance_to_start_path.get(boss_room, [])
+        main_path = self.get_path_to_start(boss_room)
         if not main_path:
             return
             
@@ -459,37 +497,97 @@ class MapGenerator:
 
     def bfs(self, start: Room) -> None:
         """广度优先搜索计算房间间的距离"""
-        queue = [start]
-        visited = {start}
-        self.distance_to_start[start] = 0
-        
-        while queue:
-            current = queue.pop(0)
-            for neighbor in self.get_neighboring_pending_room(current):
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
-                    self.distance_to_start[neighbor] = self.distance_to_start[current] + 1
-                    self.distance_to_start_path[neighbor] = self.distance_to_start_path.get(current, []) + [current]
-                    if neighbor not in self.pending_room:
-                        self.pending_room.append(neighbor)
+        self.start_room = start
+        self.distance_to_start = self.graph.distances(start)
 
     def generate(self) -> None:
-        """生成完整的地图"""
-        start_pos, _ = self.generate_base_map()
-        self.merge_rooms()
+        """生成完整的地图，从检查点恢复的生成器会跳过已完成的阶段"""
+        if not self.pending_pos:
+            self.generate_base_map()
+            self.check_constraints('base_map')
+        if not self.pending_room:
+            self.merge_rooms()
+            self.check_constraints('merged')
         self.assign_room_types()
+        self.check_constraints('typed')
+
+    def check_constraints(self, phase: str) -> None:
+        """检查给定阶段能判定的约束，不满足时由约束抛出 ConstraintViolation"""
+        if self.constraints is not None:
+            self.constraints.check(self, phase)
+
+    def checkpoint(self) -> LayoutCheckpoint:
+        """保存当前布局：合并前只包含基础地图的边，合并后还包含各房间的位置与大小"""
+        if self.start_pos is None:
+            raise ValueError("Base map has not been generated")
+        rooms = tuple((room.topLeft, room.size) for room in self.pending_room) if self.pending_room else None
+        return LayoutCheckpoint(self.width, self.height, self.start_pos, tuple(self.edges), rooms)
 
-    def render(self) -> Image.Image:
-        """渲染地图"""
-        renderer = MapRenderer(self.width, self.height)
+    @classmethod
+    def from_checkpoint(cls, checkpoint: LayoutCheckpoint, config: MapConfig = DEFAULT_CONFIG,
+                        rng: Optional[random.Random] = None) -> 'MapGenerator':
+        """从检查点恢复生成器，之后调用 generate 只会执行检查点之后的阶段"""
+        if (checkpoint.width, checkpoint.height) != (config.grid_width, config.grid_height):
+            raise ValueError("Checkpoint grid size does not match config")
+        generator = cls(config, rng)
+        generator.start_pos = checkpoint.start_pos
+        for pos in list(generator.unavailable_pos):
+            generator.pending_pos.add(pos)
+            generator.room_types[pos] = RoomType.PENDING
+        generator.unavailable_pos.clear()
+        generator.room_types[checkpoint.start_pos] = RoomType.START
+        for edge in checkpoint.edges:
+            generator.add_edge(edge)
+        for top_left, size in checkpoint.rooms or ():
+            generator.add_pending_room(Room(top_left, size, generator.room_types[top_left]))
+        return generator
+
+    def reroll_types(self, rng: Optional[random.Random] = None) -> None:
+        """保留布局与房间对象，只重新分配房间类型
+
+        房间连通图与距离缓存只依赖布局，因此可以直接复用。
+        """
+        if rng is not None:
+            self.rng = rng
+        for room in self.pending_room:
+            room.color = RoomType.START if room.topLeft == self.start_pos else RoomType.PENDING
+            room.description = ''
+        self.assign_room_types()
+
+    def to_map_data(self, seed: Optional[int] = None) -> MapData:
+        """导出不依赖 PIL 的纯数据结果"""
+        return MapData.from_generator(self, seed)
+
+    def render(self) -> 'Image.Image':
+        """渲染地图，首次调用时才导入渲染器与 PIL"""
+        from renderer import create_renderer
+
+        renderer = create_renderer(self.width, self.height, self.config)
         for room in self.pending_room:
             renderer.add_room(room)
         for edge in self.edges:
             renderer.add_edge(edge)
-        return renderer.render()
+        image = renderer.render()
+        self._renderer = renderer
+        self._rendered = {room: (room.color, room.description) for room in self.pending_room}
+        return image
+
+    def rerender(self) -> 'Image.Image':
+        """重新渲染地图，布局未变时只重绘类型或描述发生变化的房间"""
+        renderer = self._renderer
+        if renderer is None or not hasattr(renderer, 'redraw_rooms') or \
+                len(self._rendered) != len(self.pending_room) or \
+                any(room not in self._rendered for room in self.pending_room):
+            return self.render()
+        changed = [room for room in self.pending_room
+                   if self._rendered[room] != (room.color, room.description)]
+        for room in changed:
+            self._rendered[room] = (room.color, room.description)
+        return renderer.redraw_rooms(changed)
 
 def show_grave() -> None:
+    from renderer import MapRenderer
+
     renderer = MapRenderer(4, 3)
 
     renderer.add_room(Room((1, 3), (1, 1), RoomType.START))
@@ -1,21 +1,132 @@
-import uuid
-from typing import Tuple, Literal
-from dataclasses import dataclass
+import itertools
+import os
+from typing import Tuple, Literal, List, Optional
+from dataclasses import dataclass, field
 
-@dataclass
+# 房间编号为进程内递增的计数，origin 为每个进程随机生成的标记；
+# 比较时同时比较两者，多进程生成后合并的房间仍互不相等，哈希只取编号以保持小整数的速度
+def _reset_room_ids() -> None:
+    """重新生成进程标记并从零计数，fork 出的子进程也会调用"""
+    global _room_origin, _room_ids
+    _room_origin = int.from_bytes(os.urandom(8), 'little')
+    _room_ids = itertools.count()
+
+def _current_origin() -> int:
+    return _room_origin
+
+def _next_room_id() -> int:
+    return next(_room_ids)
+
+_reset_room_ids()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_room_ids)
+
+@dataclass(eq=False, slots=True)
 class Room:
     """表示地图中的一个房间"""
     topLeft: Tuple[int, int]
     size: Tuple[int, int]
     color: str
     description: str = ''
-    id: uuid.UUID = uuid.uuid4()
+    id: int = field(default_factory=_next_room_id)
+    origin: int = field(default_factory=_current_origin, repr=False)
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Room):
+            return NotImplemented
+        return self.id == other.id and self.origin == other.origin
     
     def __hash__(self) -> int:
-        return hash(self.id)
+        return self.id
 
-@dataclass
+@dataclass(slots=True)
 class Edge:
     """表示房间之间的连接"""
     start: Tuple[int, int]
-    direction: Literal['Horizontal', 'Vertical'] 
\ No newline at end of file
+    direction: Literal['Horizontal', 'Vertical']
+
+@dataclass(frozen=True)
+class LayoutCheckpoint:
+    """布局阶段的快照，rooms 为 None 表示尚未合并房间"""
+    width: int
+    height: int
+    start_pos: Tuple[int, int]
+    edges: Tuple[Edge, ...]
+    rooms: Optional[Tuple[Tuple[Tuple[int, int], Tuple[int, int]], ...]] = None  # (topLeft, size)
+
+class RoomGrid:
+    """网格单元到房间的索引，按行优先存放 width*height 个房间槽位"""
+    
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.cells: List[Optional[Room]] = [None] * (width * height)
+    
+    def index(self, pos: Tuple[int, int]) -> int:
+        """计算位置在扁平数组中的下标，越界时返回-1"""
+        x, y = pos
+        if 1 <= x <= self.width and 1 <= y <= self.height:
+            return (y - 1) * self.width + (x - 1)
+        return -1
+    
+    def get(self, pos: Tuple[int, int]) -> Optional[Room]:
+        """获取给定位置的房间"""
+        i = self.index(pos)
+        return self.cells[i] if i >= 0 else None
+    
+    def place(self, room: Room) -> None:
+        """将房间写入其覆盖的所有单元格"""
+        for x in range(room.topLeft[0], room.topLeft[0] + room.size[0]):
+            for y in range(room.topLeft[1], room.topLeft[1] + room.size[1]):
+                i = self.index((x, y))
+                if i >= 0:
+                    self.cells[i] = room
+    
+    def remove(self, room: Room) -> None:
+        """清除房间占据的单元格"""
+        for x in range(room.topLeft[0], room.topLeft[0] + room.size[0]):
+            for y in range(room.topLeft[1], room.topLeft[1] + room.size[1]):
+                i = self.index((x, y))
+                if i >= 0 and self.cells[i] is room:
+                    self.cells[i] = None
+
+# 四个方向的偏移量及其在 EdgeIndex 中的位掩码
+DIRECTIONS: List[Tuple[int, int]] = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+DIRECTION_BITS: List[int] = [1, 2, 4, 8]
+
+class EdgeIndex:
+    """按单元格与方向索引的边集合，每个单元格用4位记录左右上下是否连通"""
+    
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.links = bytearray(width * height)
+    
+    def index(self, pos: Tuple[int, int]) -> int:
+        """计算位置在扁平数组中的下标，越界时返回-1"""
+        x, y = pos
+        if 1 <= x <= self.width and 1 <= y <= self.height:
+            return (y - 1) * self.width + (x - 1)
+        return -1
+    
+    def add(self, edge: Edge) -> None:
+        """登记一条边，同时更新两端单元格"""
+        x, y = edge.start
+        if edge.direction == 'Horizontal':
+            end, start_bit, end_bit = (x + 1, y), 2, 1
+        else:
+            end, start_bit, end_bit = (x, y + 1), 8, 4
+        i, j = self.index(edge.start), self.index(end)
+        if i >= 0:
+            self.links[i] |= start_bit
+        if j >= 0:
+            self.links[j] |= end_bit
+    
+    def linked_cells(self, pos: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """获取与给定单元格通过边相连的单元格"""
+        i = self.index(pos)
+        if i < 0:
+            return []
+        mask = self.links[i]
+        return [(pos[0] + dx, pos[1] + dy)
+                for (dx, dy), bit in zip(DIRECTIONS, DIRECTION_BITS) if mask & bit]
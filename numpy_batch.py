@@ -0,0 +1,398 @@
+"""用 NumPy 一次生成一批地图的向量化内核
+
+与 MapGenerator 使用相同的规则：基础地图按随机边界生长成生成树且起点只连一条边，
+房间合并的次数、1x2/1x3/2x2 合并条件及叶子检查相同，类型分配的商店、Boss、休息房间、
+精英概率规则也相同。每一步在整批地图上同时执行，因此只有随机数序列与逐张生成不同。
+
+结果以数组保存在 MapBatch 中：(B, H, W) 的房间编号网格、(B, H, W, 2) 的向右/向下边、
+以及 (B, R) 的房间类型编码等，R 为批内最大房间数，多余位置填 NO_ROOM。
+"""
+from dataclasses import dataclass
+from typing import Iterator, Tuple
+import numpy as np
+from batch import derive_seed
+from map_data import MapData, FLAG_LEAF, FLAG_MAIN_PATH, EDGE_RIGHT, EDGE_DOWN
+from config import RoomType, ROOM_TYPE_CODES, MapConfig, DEFAULT_CONFIG
+
+NO_ROOM = 255
+
+# 单元格状态
+_UNAVAILABLE, _AVAILABLE, _PENDING = 0, 1, 2
+# 方向下标，顺序与 models.DIRECTIONS 相同
+_LEFT, _RIGHT, _UP, _DOWN = 0, 1, 2, 3
+
+
+@dataclass
+class MapBatch:
+    """一批地图的数组表示，房间按左上角单元格的行优先顺序编号"""
+    width: int
+    height: int
+    seed: int
+    rooms: np.ndarray  # (B, H, W) 单元格所属房间编号
+    edges: np.ndarray  # (B, H, W, 2) 向右、向下的边
+    room_count: np.ndarray  # (B,)
+    room_x: np.ndarray  # (B, R) 左上角，从1开始
+    room_y: np.ndarray
+    room_w: np.ndarray
+    room_h: np.ndarray
+    room_types: np.ndarray  # (B, R) config.ROOM_TYPE_CODES
+    distances: np.ndarray  # (B, R) 到起点的距离，不可达为-1
+    flags: np.ndarray  # (B, R) FLAG_LEAF | FLAG_MAIN_PATH
+
+    def __len__(self) -> int:
+        return len(self.room_count)
+
+    def to_map_data(self, index: int) -> MapData:
+        """转换为单张 MapData，可直接用于渲染与存储"""
+        data = MapData.empty(self.width, self.height)
+        for i in range(int(self.room_count[index])):
+            data.add_room((int(self.room_x[index, i]), int(self.room_y[index, i])),
+                          (int(self.room_w[index, i]), int(self.room_h[index, i])),
+                          int(self.room_types[index, i]), int(self.distances[index, i]),
+                          int(self.flags[index, i]))
+        for y, x in zip(*np.nonzero(self.edges[index, :, :, 0])):
+            data.set_edge((int(x) + 1, int(y) + 1), EDGE_RIGHT)
+        for y, x in zip(*np.nonzero(self.edges[index, :, :, 1])):
+            data.set_edge((int(x) + 1, int(y) + 1), EDGE_DOWN)
+        return data
+
+    def __iter__(self) -> Iterator[MapData]:
+        for index in range(len(self)):
+            yield self.to_map_data(index)
+
+
+def _choose(mask: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """在每行为 True 的位置中等概率选取一个下标，整行为 False 时返回-1"""
+    counts = mask.sum(1)
+    k = (rng.random(len(mask)) * counts).astype(np.int64)
+    index = np.argmax(np.cumsum(mask, 1) > k[:, None], axis=1)
+    return np.where(counts > 0, index, -1)
+
+
+def _first(mask: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """每行中 keys 最小的 True 位置，即随机打乱后的第一个，整行为 False 时返回-1"""
+    ranked = np.where(mask, keys, np.inf)
+    index = np.argmin(ranked, axis=1)
+    return np.where(mask.any(1), index, -1)
+
+
+class _BatchKernel:
+    """单批地图的生成状态
+
+    单元格按行优先编号，下标 N 为网格外的哨兵单元格，使邻居查询不需要边界判断。
+    """
+
+    def __init__(self, config: MapConfig, count: int, rng: np.random.Generator) -> None:
+        self.config = config
+        self.rng = rng
+        self.B = count
+        self.W = config.grid_width
+        self.H = config.grid_height
+        self.N = self.W * self.H
+        self.rows = np.arange(count)
+
+        x = np.arange(self.N) % self.W
+        y = np.arange(self.N) // self.W
+        cells = np.arange(self.N)
+        self.nbr = np.stack([
+            np.where(x > 0, cells - 1, self.N),
+            np.where(x < self.W - 1, cells + 1, self.N),
+            np.where(y > 0, cells - self.W, self.N),
+            np.where(y < self.H - 1, cells + self.W, self.N),
+        ], axis=1)
+        # 哨兵的邻居仍是哨兵
+        self.nbr = np.vstack([self.nbr, np.full((1, 4), self.N)])
+
+        self.right = np.zeros((count, self.N), dtype=bool)
+        self.down = np.zeros((count, self.N), dtype=bool)
+        self.start = np.zeros(count, dtype=np.int64)
+
+    # ---- 基础地图 ----
+
+    def generate_base_map(self) -> None:
+        B, N, W, H, rng, rows = self.B, self.N, self.W, self.H, self.rng, self.rows
+        status = np.full((B, N + 1), _UNAVAILABLE, dtype=np.int8)
+        status[:, N] = _PENDING
+        connected = np.zeros((B, N + 1), dtype=bool)
+        near_connected = np.zeros((B, N + 1), dtype=bool)
+
+        # 起点位于网格边缘
+        on_side = rng.random(B) < 0.5
+        far = rng.random(B) < 0.5
+        x = np.where(on_side, np.where(far, W, 1), rng.integers(1, W + 1, B))
+        y = np.where(on_side, rng.integers(1, H + 1, B), np.where(far, H, 1))
+        start = (y - 1) * W + (x - 1)
+        self.start = start
+        start_connected = np.zeros(B, dtype=bool)
+
+        def set_pending(pos: np.ndarray) -> None:
+            status[rows, pos] = _PENDING
+            neighbors = self.nbr[pos]
+            fresh = status[rows[:, None], neighbors] == _UNAVAILABLE
+            status[np.broadcast_to(rows[:, None], neighbors.shape)[fresh], neighbors[fresh]] = _AVAILABLE
+
+        def set_connected(sel: np.ndarray, pos: np.ndarray) -> None:
+            connected[sel, pos] = True
+            near_connected[sel[:, None], self.nbr[pos]] = True
+
+        set_pending(start)
+        set_connected(rows, start)
+
+        # 每张地图每一步都恰好新增一个待处理单元格，共 N-1 步
+        for _ in range(N - 1):
+            available = status[:, :N] == _AVAILABLE
+            frontier = available & near_connected[:, :N]
+            pool = np.where(frontier.any(1)[:, None], frontier, available)
+            pos = _choose(pool, rng)
+            set_pending(pos)
+
+            neighbors = self.nbr[pos]
+            candidates = connected[rows[:, None], neighbors]
+            is_start = neighbors == start[:, None]
+            involved = (candidates & is_start).any(1)
+            # 起点只与第一个相邻的已连接位置相连，之后排除起点
+            candidates = np.where((involved & start_connected)[:, None], candidates & ~is_start, candidates)
+            candidates = np.where((involved & ~start_connected)[:, None], candidates & is_start, candidates)
+            start_connected |= involved
+
+            direction = _choose(candidates, rng)
+            ok = direction >= 0
+            sel, pos, direction = rows[ok], pos[ok], direction[ok]
+            cell = np.where(direction == _LEFT, pos - 1, np.where(direction == _UP, pos - W, pos))
+            horizontal = direction < _UP
+            self.right[sel[horizontal], cell[horizontal]] = True
+            self.down[sel[~horizontal], cell[~horizontal]] = True
+            set_connected(sel, pos)
+
+    # ---- 房间合并 ----
+
+    def _links(self) -> np.ndarray:
+        """(B, N+1, 4) 的单元格连接，哨兵行全为 False"""
+        links = np.zeros((self.B, self.N + 1, 4), dtype=bool)
+        links[:, :self.N, _RIGHT] = self.right
+        links[:, :self.N, _DOWN] = self.down
+        links[:, 1:self.N, _LEFT] = self.right[:, :-1]
+        links[:, self.W:self.N, _UP] = self.down[:, :-self.W]
+        return links
+
+    def _is_single(self, sel: np.ndarray, cell: np.ndarray) -> np.ndarray:
+        """单元格是否为 1x1 的待处理房间（起点不参与合并）"""
+        inside = cell < self.N
+        cell = np.where(inside, cell, 0)
+        return inside & self.anchor[sel, cell] & (self.room_w[sel, cell] == 1) & \
+            (self.room_h[sel, cell] == 1) & (cell != self.start[sel])
+
+    def _merge(self, sel: np.ndarray, members: np.ndarray, width: int, height: int) -> np.ndarray:
+        """尝试将 members 合并为一个房间，合并后会成为叶子时放弃，返回是否合并"""
+        neighbors = self.nbr[members]
+        links = self.links[sel[:, None], members]
+        internal = (neighbors[..., None] == members[:, None, None, :]).any(-1)
+        # 生成树中两个房间之间至多一条边，因此外部连接数即相邻房间数
+        accept = (links & ~internal).sum((1, 2)) != 1
+        sel, members = sel[accept], members[accept]
+        top_left = members.min(1)
+        self.anchor[sel[:, None], members] = False
+        self.anchor[sel, top_left] = True
+        self.room_of[sel[:, None], members] = top_left[:, None]
+        self.room_w[sel, top_left] = width
+        self.room_h[sel, top_left] = height
+        return accept
+
+    def merge_rooms(self) -> None:
+        B, N, W, rng, rows = self.B, self.N, self.W, self.rng, self.rows
+        self.links = self._links()
+        self.anchor = np.ones((B, N), dtype=bool)
+        self.room_of = np.tile(np.arange(N + 1), (B, 1))
+        self.room_w = np.ones((B, N), dtype=np.uint8)
+        self.room_h = np.ones((B, N), dtype=np.uint8)
+
+        for _ in range(N // 2):
+            room = _choose(self.anchor, rng)
+            direction = _choose(self.links[rows, room], rng)
+            neighbor = self.nbr[room, direction]
+            ok = (direction >= 0) & self._is_single(rows, room) & self._is_single(rows, neighbor)
+
+            sel, room, neighbor, direction = rows[ok], room[ok], neighbor[ok], direction[ok]
+            same_row = direction < _UP
+            merged = np.zeros(len(sel), dtype=bool)
+            for row_pair in (True, False):
+                part = same_row == row_pair
+                members = np.stack([room[part], neighbor[part]], 1)
+                merged[part] = self._merge(sel[part], members, *((2, 1) if row_pair else (1, 2)))
+
+            sel, same_row = sel[merged], same_row[merged]
+            first = np.minimum(room, neighbor)[merged]
+            further = rng.random(len(sel)) < self.config.merge_chance
+            line = rng.random(len(sel)) < 0.5
+            for row_pair in (True, False):
+                part = (same_row == row_pair) & further
+                second = first + (1 if row_pair else W)
+                self._merge_line(sel[part & line], first[part & line], second[part & line], row_pair)
+                self._merge_square(sel[part & ~line], first[part & ~line], second[part & ~line], row_pair)
+
+    def _merge_line(self, sel: np.ndarray, first: np.ndarray, second: np.ndarray, row_pair: bool) -> None:
+        """沿合并方向延伸为 1x3：依次检查前端与后端的相邻房间，只尝试第一个符合条件的"""
+        before, after = (_LEFT, _RIGHT) if row_pair else (_UP, _DOWN)
+        candidates = []
+        for cell, direction in ((first, before), (second, after)):
+            third = self.nbr[cell, direction]
+            candidates.append((third, self.links[sel, cell, direction] & self._is_single(sel, third)))
+        (third_a, ok_a), (third_b, ok_b) = candidates
+        third = np.where(ok_a, third_a, third_b)
+        ok = ok_a | ok_b
+        members = np.stack([first, second, third], 1)[ok]
+        self._merge(sel[ok], members, *((3, 1) if row_pair else (1, 3)))
+
+    def _merge_square(self, sel: np.ndarray, first: np.ndarray, second: np.ndarray, row_pair: bool) -> None:
+        """与相邻的一对 1x1 房间合并为 2x2：水平对先上后下，竖直对先右后左"""
+        sides = ((_UP, _DOWN) if row_pair else (_RIGHT, _LEFT))
+        pair_link = _RIGHT if row_pair else _DOWN
+        chosen = np.full((len(sel), 2), -1, dtype=np.int64)
+        found = np.zeros(len(sel), dtype=bool)
+        for side in sides:
+            n1, n2 = self.nbr[first, side], self.nbr[second, side]
+            inside = (n1 < self.N) & (n2 < self.N)
+            safe_n1 = np.where(inside, n1, 0)
+            can = ~found & inside & self._is_single(sel, n1) & self._is_single(sel, n2) & \
+                self.links[sel, safe_n1, pair_link] & \
+                (self.links[sel, first, side] | self.links[sel, second, side])
+            chosen[can] = np.stack([n1, n2], 1)[can]
+            found |= can
+        members = np.concatenate([np.stack([first, second], 1), chosen], 1)[found]
+        self._merge(sel[found], members, 2, 2)
+
+    # ---- 类型分配 ----
+
+    def assign_room_types(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """返回 (类型编码, 距离, 标记)，均为以房间左上角单元格为下标的 (B, N) 数组"""
+        B, N, rng, rows = self.B, self.N, self.rng, self.rows
+        own = self.room_of[:, :N]
+        neighbor_room = self.room_of[rows[:, None, None], self.nbr[None, :N, :]]
+        external = self.links[:, :N] & (neighbor_room != own[..., None])
+
+        flat = (rows[:, None] * N + own).ravel()
+        degree = np.bincount(flat, weights=external.sum(2).ravel(), minlength=B * N).reshape(B, N)
+        leaf = self.anchor & (degree == 1)
+
+        # 房间级广度优先搜索，逐层扩展尚未到达的房间
+        edge_b, edge_cell, edge_dir = np.nonzero(external)
+        edge_src = own[edge_b, edge_cell]
+        edge_dst = neighbor_room[edge_b, edge_cell, edge_dir]
+        distances = np.full((B, N), -1, dtype=np.int16)
+        parents = np.full((B, N), -1, dtype=np.int64)
+        distances[rows, self.start] = 0
+        depth = 0
+        while len(edge_b):
+            step = distances[edge_b, edge_src] == depth
+            b, src, dst = edge_b[step], edge_src[step], edge_dst[step]
+            distances[b, dst] = depth + 1
+            parents[b, dst] = src
+            depth += 1
+            remaining = distances[edge_b, edge_dst] < 0
+            edge_b, edge_src, edge_dst = edge_b[remaining], edge_src[remaining], edge_dst[remaining]
+            if not step.any():
+                break
+        longest = distances.max(1)
+
+        types = np.full((B, N), ROOM_TYPE_CODES[RoomType.PENDING], dtype=np.uint8)
+        types[rows, self.start] = ROOM_TYPE_CODES[RoomType.START]
+        pending = self.anchor.copy()
+        pending[rows, self.start] = False
+        keys = rng.random((B, N))
+
+        # 商店与 Boss 取打乱后的第一个符合条件的叶子
+        pending_leaf = pending & leaf
+        shop = _first(pending_leaf, keys)
+        has_shop = shop >= 0
+        types[rows[has_shop], shop[has_shop]] = ROOM_TYPE_CODES[RoomType.SHOP]
+        pending_leaf[rows[has_shop], shop[has_shop]] = False
+        boss = _first(pending_leaf & (distances == longest[:, None]) & (distances >= 0), keys)
+        has_boss = boss >= 0
+        types[rows[has_boss], boss[has_boss]] = ROOM_TYPE_CODES[RoomType.BOSS]
+        pending_leaf[rows[has_boss], boss[has_boss]] = False
+        event = rng.random((B, N)) < 0.5
+        types[pending_leaf] = np.where(event, ROOM_TYPE_CODES[RoomType.EVENT],
+                                       ROOM_TYPE_CODES[RoomType.BLESSING])[pending_leaf]
+
+        # 主路径：从 Boss 沿父指针回到起点，不含 Boss 本身
+        path_length = np.where(has_boss, distances[rows, np.maximum(boss, 0)], 0).astype(np.int64)
+        max_length = int(path_length.max(initial=0))
+        path = np.zeros((B, max(max_length, 1)), dtype=np.int64)
+        current = np.where(has_boss, parents[rows, np.maximum(boss, 0)], -1)
+        for _ in range(max_length):
+            walking = current >= 0
+            path[rows[walking], distances[rows[walking], current[walking]]] = current[walking]
+            current = np.where(walking, parents[rows, np.maximum(current, 0)], -1)
+        flags = np.where(leaf, FLAG_LEAF, 0).astype(np.uint8)
+        on_path = np.arange(path.shape[1])[None, :] < path_length[:, None]
+        flags[np.broadcast_to(rows[:, None], path.shape)[on_path], path[on_path]] |= FLAG_MAIN_PATH
+
+        # 休息房间：主路径中点附近最近的 1x1 房间，同距离时偏向起点一侧
+        single = (self.room_w[rows[:, None], path] == 1) & (self.room_h[rows[:, None], path] == 1) & on_path
+        middle = path_length // 2
+        rest = np.full(B, -1, dtype=np.int64)
+        for radius in range(max_length + 1):
+            for offset in (middle - radius, middle + radius):
+                valid = (rest < 0) & (offset >= 0) & (offset < path_length)
+                hit = valid & single[rows, np.clip(offset, 0, path.shape[1] - 1)]
+                rest[hit] = offset[hit]
+        has_rest = rest >= 0
+        types[rows[has_rest], path[rows[has_rest], rest[has_rest]]] = ROOM_TYPE_CODES[RoomType.REST]
+
+        # 非叶子房间：距起点小于3为战斗，否则按当前列表抽取，每出现一个精英列表多一个战斗
+        pending_inner = pending & ~leaf & (types != ROOM_TYPE_CODES[RoomType.REST])
+        order = np.argsort(np.where(pending_inner, keys, np.inf), axis=1)
+        inner_count = pending_inner.sum(1)
+        elites = np.zeros(B, dtype=np.int64)
+        for rank in range(int(inner_count.max(initial=0))):
+            room = order[:, rank]
+            active = rank < inner_count
+            near = (distances[rows, room] >= 0) & (distances[rows, room] < 3)
+            elite = active & ~near & (rng.random(B) * (3 + elites) < 1)
+            elites += elite
+            types[rows[active], room[active]] = np.where(
+                elite, ROOM_TYPE_CODES[RoomType.ELITES], ROOM_TYPE_CODES[RoomType.BATTLE])[active]
+        return types, distances, flags
+
+    def result(self, seed: int) -> MapBatch:
+        types, distances, flags = self.assign_room_types()
+        B, N, W, H, rows = self.B, self.N, self.W, self.H, self.rows
+        rank = np.cumsum(self.anchor, 1) - 1
+        room_count = self.anchor.sum(1)
+        width = int(room_count.max(initial=0))
+        batch_index, cell = np.nonzero(self.anchor)
+        slot = rank[batch_index, cell]
+
+        def per_room(values: np.ndarray, dtype: type, fill: int) -> np.ndarray:
+            out = np.full((B, width), fill, dtype=dtype)
+            out[batch_index, slot] = values
+            return out
+
+        return MapBatch(
+            width=W, height=H, seed=seed,
+            rooms=rank[rows[:, None], self.room_of[:, :N]].reshape(B, H, W).astype(np.int32),
+            edges=np.stack([self.right, self.down], -1).reshape(B, H, W, 2),
+            room_count=room_count,
+            room_x=per_room(cell % W + 1, np.uint16, 0),
+            room_y=per_room(cell // W + 1, np.uint16, 0),
+            room_w=per_room(self.room_w[batch_index, cell], np.uint8, 0),
+            room_h=per_room(self.room_h[batch_index, cell], np.uint8, 0),
+            room_types=per_room(types[batch_index, cell], np.uint8, NO_ROOM),
+            distances=per_room(distances[batch_index, cell], np.int16, -1),
+            flags=per_room(flags[batch_index, cell], np.uint8, 0),
+        )
+
+
+def generate_arrays(config: MapConfig = DEFAULT_CONFIG, count: int = 1024, seed: int = 0) -> MapBatch:
+    """在一次调用中生成 count 张地图"""
+    kernel = _BatchKernel(config, count, np.random.default_rng(seed))
+    kernel.generate_base_map()
+    kernel.merge_rooms()
+    return kernel.result(seed)
+
+
+def iter_batches(config: MapConfig = DEFAULT_CONFIG, count: int = 1024, seed: int = 0,
+                 batch_size: int = 4096) -> Iterator[MapBatch]:
+    """分批生成 count 张地图，第 i 批使用 derive_seed(seed, i) 作为种子"""
+    for index, start in enumerate(range(0, count, batch_size)):
+        yield generate_arrays(config, min(batch_size, count - start), derive_seed(seed, index))
@@ -0,0 +1,159 @@
+from typing import Any, Tuple
+import numpy as np
+from PIL import Image
+from models import Room, Edge
+from map_data import MapData, EDGE_RIGHT, EDGE_DOWN
+from config import COLOR_MAP, ROOM_TYPE_CODES, ROOM_TYPE_NAMES, MapConfig, DEFAULT_CONFIG
+
+EDGE_COLOR = (0x00, 0x00, 0x8B)
+EMPTY_COLOR = (240, 240, 240)
+
+
+def _hex_to_rgb(color: str) -> Tuple[int, int, int]:
+    value = int(color.lstrip('#'), 16)
+    return (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF
+
+
+class NumpyMapRenderer:
+    """使用 NumPy 数组切片整体绘制地图的渲染器
+
+    几何规则与 MapRenderer 一致，房间覆盖在边之上。
+    以单元格行/列为单位批量写入像素，不绘制文字标签，因此要求 show_labels=False。
+    """
+
+    def __init__(self, width: int, height: int, config: MapConfig = DEFAULT_CONFIG) -> None:
+        if config.show_labels:
+            raise ValueError("The numpy renderer does not draw labels; set show_labels=False")
+        self.width = width
+        self.height = height
+        self.config = config
+        self.data: Any = MapData.empty(width, height)
+
+    @classmethod
+    def from_map_data(cls, data: Any, config: MapConfig = DEFAULT_CONFIG) -> 'NumpyMapRenderer':
+        """直接使用 MapData 或 MapView 的数组，无需转换为 Room/Edge 对象"""
+        renderer = cls(data.width, data.height, config)
+        renderer.data = data
+        return renderer
+
+    def add_room(self, room: Room) -> None:
+        """添加房间到渲染列表"""
+        self.data.add_room(room.topLeft, room.size, ROOM_TYPE_CODES[room.color])
+
+    def add_edge(self, edge: Edge) -> None:
+        """添加边到渲染列表"""
+        self.data.set_edge(edge.start, EDGE_RIGHT if edge.direction == 'Horizontal' else EDGE_DOWN)
+
+    def _cell_grid(self) -> Tuple[np.ndarray, np.ndarray]:
+        """构建 (height, width) 的单元格标识网格及对应颜色表
+
+        房间单元格的标识为房间下标，空单元格使用互不相同的负数，保证不会与邻居合并。
+        """
+        data = self.data
+        count = data.room_count
+        cells = -2 - np.arange(self.width * self.height, dtype=np.int64).reshape(self.height, self.width)
+        colors = np.empty((count + self.width * self.height, 3), dtype=np.uint8)
+        default_color = 0xAEA8A5
+        for i in range(count):
+            x, y = data.room_x[i] - 1, data.room_y[i] - 1
+            cells[y:y + data.room_h[i], x:x + data.room_w[i]] = i
+            color = COLOR_MAP.get(ROOM_TYPE_NAMES[data.room_types[i]])
+            if not color:
+                color = f'#{default_color:06x}'
+                default_color -= 0x040404
+            colors[i] = _hex_to_rgb(color)
+        colors[count:] = EMPTY_COLOR
+        return cells, colors
+
+    def _edge_grid(self) -> Tuple[np.ndarray, np.ndarray]:
+        """将边位图展开为 (height, width) 的向右、向下布尔网格"""
+        bits = np.unpackbits(np.frombuffer(bytes(self.data.edges), dtype=np.uint8), bitorder='little')
+        bits = bits[:self.width * self.height * 2].reshape(self.height, self.width, 2).astype(bool)
+        return bits[:, :, 0], bits[:, :, 1]
+
+    def _axis(self, cells: int, cell_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """计算每个像素所在的单元格下标、单元格内偏移及是否位于网格内"""
+        px = np.arange(self.config.map_length) - self.config.page_margin
+        index = px // cell_size
+        inside = (px >= 0) & (index < cells)
+        return np.clip(index, 0, cells - 1), px % cell_size, inside
+
+    def render(self) -> Image.Image:
+        """渲染完整地图"""
+        length = self.config.map_length
+        margin = self.config.object_margin
+        edge_width = self.config.edge_width
+        page_margin = self.config.page_margin
+        cell_width = (length - page_margin * 2) // self.width
+        cell_height = (length - page_margin * 2) // self.height
+
+        canvas = np.empty((length, length, 3), dtype=np.uint8)
+        cells, colors = self._cell_grid()
+        right, down = self._edge_grid()
+        col_cell, col_offset, col_inside = self._axis(self.width, cell_width)
+        row_cell, row_offset, row_inside = self._axis(self.height, cell_height)
+
+        # 房间与空单元格：同一房间相邻单元格之间的边距被填满
+        same_left = np.zeros(cells.shape, dtype=bool)
+        same_left[:, 1:] = cells[:, 1:] == cells[:, :-1]
+        same_right = np.zeros(cells.shape, dtype=bool)
+        same_right[:, :-1] = same_left[:, 1:]
+        same_up = np.zeros(cells.shape, dtype=bool)
+        same_up[1:, :] = cells[1:, :] == cells[:-1, :]
+        same_down = np.zeros(cells.shape, dtype=bool)
+        same_down[:-1, :] = same_up[1:, :]
+
+        # 每个单元格行分为上边距、中部、下边距三段，每段内各像素行完全相同，
+        # 先拼出一行模板再整段写入；band_masks[row_band[r]] 给出第 r 行被房间覆盖的像素
+        canvas[:page_margin] = 255
+        canvas[page_margin + self.height * cell_height:] = 255
+        band_masks = [np.zeros(length, dtype=bool)]
+        row_band = np.zeros(length, dtype=np.intp)
+        slots = np.where(cells >= 0, cells, self.data.room_count + (-2 - cells))
+        for y in range(self.height):
+            columns = col_inside & \
+                ((col_offset >= margin) | same_left[y, col_cell]) & \
+                ((col_offset <= cell_width - margin) | same_right[y, col_cell])
+            pixels = colors[slots[y, col_cell]]
+            top = page_margin + y * cell_height
+            bands = (
+                (top, top + margin, columns & same_up[y, col_cell]),
+                (top + margin, top + cell_height - margin + 1, columns),
+                (top + cell_height - margin + 1, top + cell_height, columns & same_down[y, col_cell]),
+            )
+            for start, stop, mask in bands:
+                start, stop = max(start, 0), min(stop, length)
+                if start < stop:
+                    canvas[start:stop] = np.where(mask[:, None], pixels, np.uint8(255))
+                    row_band[start:stop] = len(band_masks)
+                    band_masks.append(mask)
+        covered = np.stack(band_masks)
+
+        # 边绘制在房间之下，因此只写入未被房间覆盖的像素
+        half = (edge_width - 1) // 2
+
+        # 水平边：逐行写入宽度为 edge_width 的横带
+        from_left = np.zeros_like(right)
+        from_left[:, 1:] = right[:, :-1]
+        for y in range(self.height):
+            center = page_margin + y * cell_height + cell_height // 2
+            top, bottom = max(center - half, 0), min(center - half + edge_width, length)
+            columns = col_inside & (
+                (right[y, col_cell] & (col_offset >= cell_width // 2)) |
+                (from_left[y, col_cell] & (col_offset <= cell_width // 2)))
+            if columns.any():
+                canvas[top:bottom][columns[None, :] & ~covered[row_band[top:bottom]]] = EDGE_COLOR
+
+        # 垂直边：逐列写入竖带
+        from_above = np.zeros_like(down)
+        from_above[1:, :] = down[:-1, :]
+        for x in range(self.width):
+            center = page_margin + x * cell_width + cell_width // 2
+            left, right_px = max(center - half, 0), min(center - half + edge_width, length)
+            rows = row_inside & (
+                (down[row_cell, x] & (row_offset >= cell_height // 2)) |
+                (from_above[row_cell, x] & (row_offset <= cell_height // 2)))
+            if rows.any():
+                canvas[:, left:right_px][rows[:, None] & ~covered[row_band, left:right_px]] = EDGE_COLOR
+
+        return Image.fromarray(canvas, 'RGB')
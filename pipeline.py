@@ -0,0 +1,153 @@
+import gzip
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Deque, IO, Iterator, List, Optional, Tuple
+from batch import derive_seed, _generate_range
+from dedup import Deduplicator
+from map_data import MapData
+from map_format import MapWriter
+from config import MapConfig, DEFAULT_CONFIG
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+def iter_maps(config: MapConfig = DEFAULT_CONFIG, count: Optional[int] = None,
+              seed: int = 0, workers: Optional[int] = 1, render: bool = False,
+              chunk_size: int = 64,
+              dedup: Optional[Deduplicator] = None) -> Iterator[Tuple[int, MapData, Optional['Image.Image']]]:
+    """逐张产出 (种子, 地图数据, 可选图像)，不在内存中累积结果
+
+    多进程时最多同时持有 workers * 2 个分块，生成速度快于消费时会等待消费者。
+
+    Args:
+        config: 地图生成配置
+        count: 生成数量，默认使用 config.generator_count
+        seed: 批次种子，与 generate_batch 相同的种子产出相同的地图
+        workers: 进程数，None 表示使用全部CPU，1 表示在当前进程中生成
+        render: 是否渲染图像
+        chunk_size: 每个任务包含的地图数量
+        dedup: 去重器，与已产出地图在旋转/镜像下相同的地图在渲染前跳过
+    """
+    if count is None:
+        count = config.generator_count
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if render:
+        # 只在需要图像时导入渲染器与 PIL
+        from renderer import get_renderer_class
+
+    for index, data in enumerate(_iter_map_data(config, count, seed, workers, chunk_size)):
+        if dedup is not None and not dedup.add(data):
+            continue
+        image = get_renderer_class(config).from_map_data(data, config).render() if render else None
+        yield derive_seed(seed, index), data, image
+
+
+def _iter_map_data(config: MapConfig, count: int, seed: int,
+                   workers: int, chunk_size: int) -> Iterator[MapData]:
+    if workers <= 1:
+        for start in range(0, count, chunk_size):
+            yield from _generate_range(config, seed, start, min(start + chunk_size, count))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque['Future[List[MapData]]'] = deque()
+        starts = iter(range(0, count, chunk_size))
+        for start in starts:
+            pending.append(executor.submit(_generate_range, config, seed, start,
+                                           min(start + chunk_size, count)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            chunk = pending.popleft().result()
+            start = next(starts, None)
+            if start is not None:
+                pending.append(executor.submit(_generate_range, config, seed, start,
+                                               min(start + chunk_size, count)))
+            yield from chunk
+
+
+class MapSink(ABC):
+    """地图输出端的基类，支持 with 语句"""
+
+    @abstractmethod
+    def write(self, seed: int, data: MapData, image: Optional['Image.Image']) -> None:
+        """写入一张地图"""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'MapSink':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class JsonLinesSink(MapSink):
+    """每行写入一张地图的 JSON，路径以 .gz 结尾时使用 gzip 压缩"""
+
+    def __init__(self, path: str) -> None:
+        self.file: IO[str] = gzip.open(path, 'wt', encoding='utf-8') if path.endswith('.gz') \
+            else open(path, 'w', encoding='utf-8')
+
+    def write(self, seed: int, data: MapData, image: Optional['Image.Image']) -> None:
+        self.file.write(json.dumps(data.to_dict(), separators=(',', ':')))
+        self.file.write('\n')
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class BinarySink(MapSink):
+    """写入 map_format 定义的二进制地图文件"""
+
+    def __init__(self, path: str) -> None:
+        self.writer = MapWriter(path)
+
+    def write(self, seed: int, data: MapData, image: Optional['Image.Image']) -> None:
+        self.writer.write(data)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class PngDirectorySink(MapSink):
+    """将每张地图的图像保存为目录中的 PNG 文件"""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.index = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, seed: int, data: MapData, image: Optional['Image.Image']) -> None:
+        if image is None:
+            raise ValueError("PngDirectorySink requires rendered images")
+        image.save(os.path.join(self.directory, f'{self.index:08d}_{seed}.png'))
+        self.index += 1
+
+
+def read_json_lines(path: str) -> Iterator[MapData]:
+    """逐行读取 JsonLinesSink 写出的文件"""
+    with (gzip.open(path, 'rt', encoding='utf-8') if path.endswith('.gz')
+          else open(path, encoding='utf-8')) as file:
+        for line in file:
+            if line.strip():
+                yield MapData.from_dict(json.loads(line))
+
+
+def run_pipeline(sink: MapSink, config: MapConfig = DEFAULT_CONFIG,
+                 count: Optional[int] = None, seed: int = 0,
+                 workers: Optional[int] = 1, render: bool = False,
+                 dedup: Optional[Deduplicator] = None) -> int:
+    """将生成的地图逐张写入输出端，返回写入数量，给出 dedup 时跳过重复地图"""
+    written = 0
+    with sink:
+        for map_seed, data, image in iter_maps(config, count, seed, workers, render, dedup=dedup):
+            sink.write(map_seed, data, image)
+            written += 1
+    return written
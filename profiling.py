@@ -0,0 +1,200 @@
+"""可选的地图生成性能统计
+
+Profiler.attach 用计时包装替换单个 MapGenerator 实例上的阶段方法和计数方法，
+未 attach 的生成器不经过任何统计代码，因此关闭时没有额外开销。
+
+各阶段只统计自身耗时：bfs 在 assign_room_types 内执行，其耗时只计入 bfs，
+因此各生成阶段之和不超过 generate 的总耗时。
+Profiler(trace_allocations=True) 时用 tracemalloc 快照统计各阶段新分配且在阶段结束时
+仍存活的内存块数与字节数；阶段内分配后又释放的内存不计入，快照本身也会明显拖慢生成。
+
+    profiler = Profiler()
+    generator = profiler.attach(MapGenerator(config))
+    generator.generate()
+    print(profiler.stats.summary())
+"""
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 按执行顺序排列的阶段方法，bfs 嵌套在 assign_room_types 中
+PHASES = ('generate_base_map', 'merge_rooms', 'assign_room_types', 'bfs', 'render')
+# generate 中执行的阶段，它们的自身耗时之和不超过 GenerationStats.wall
+GENERATION_PHASES = PHASES[:-1]
+
+
+@dataclass
+class PhaseTiming:
+    """单个阶段的累计耗时，不含嵌套在其中的其他阶段"""
+    calls: int = 0
+    wall: float = 0.0  # 秒
+    cpu: float = 0.0  # 秒
+    allocations: int = 0  # 仅 trace_allocations 时统计：阶段结束时仍存活的新分配块数
+    allocated_bytes: int = 0  # 同上，字节数
+
+    def merge(self, other: 'PhaseTiming') -> None:
+        self.calls += other.calls
+        self.wall += other.wall
+        self.cpu += other.cpu
+        self.allocations += other.allocations
+        self.allocated_bytes += other.allocated_bytes
+
+
+@dataclass
+class GenerationStats:
+    """可跨地图、跨批次累加的统计结果"""
+    maps: int = 0
+    phases: Dict[str, PhaseTiming] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    wall: float = 0.0  # generate 的总墙钟时间，秒
+
+    def merge(self, other: 'GenerationStats') -> 'GenerationStats':
+        """将另一份统计累加到自身"""
+        self.maps += other.maps
+        self.wall += other.wall
+        for name, timing in other.phases.items():
+            self.phases.setdefault(name, PhaseTiming()).merge(timing)
+        for name, value in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'maps': self.maps,
+            'phases': {name: vars(timing).copy() for name, timing in self.phases.items()},
+            'counters': dict(self.counters),
+            'wall': self.wall,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'GenerationStats':
+        return cls(data['maps'],
+                   {name: PhaseTiming(**timing) for name, timing in data['phases'].items()},
+                   dict(data['counters']), data.get('wall', 0.0))
+
+    def summary(self) -> str:
+        """格式化为便于阅读的表格"""
+        maps = max(self.maps, 1)
+        lines = [f'{self.maps} maps, {self.wall * 1e3:.2f}ms in generate']
+        traced = any(timing.allocations for timing in self.phases.values())
+        for name, timing in self.phases.items():
+            line = (f'  {name:<18} {timing.wall * 1e3:10.2f}ms wall {timing.cpu * 1e3:10.2f}ms cpu '
+                    f'{timing.wall / maps * 1e3:8.3f}ms/map')
+            if traced:
+                line += f' {timing.allocations / maps:9.1f} allocs/map {timing.allocated_bytes / maps:10.0f} B/map'
+            lines.append(line)
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'  {name:<18} {value:10d} {value / maps:12.1f}/map')
+        return '\n'.join(lines)
+
+
+class Profiler:
+    """收集一个或多个 MapGenerator 的阶段耗时与计数"""
+
+    def __init__(self, stats: Optional[GenerationStats] = None, trace_allocations: bool = False) -> None:
+        self.stats = stats if stats is not None else GenerationStats()
+        self.trace_allocations = trace_allocations
+        # 正在执行的阶段栈，每层累计其子阶段的 [墙钟, CPU, 分配块数, 分配字节]
+        self._stack: List[List[float]] = []
+
+    def count(self, name: str, value: int = 1) -> None:
+        counters = self.stats.counters
+        counters[name] = counters.get(name, 0) + value
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    @staticmethod
+    def _allocated(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> Tuple[int, int]:
+        """两次快照之间新增且仍存活的内存块数与字节数"""
+        count = size = 0
+        for stat in after.compare_to(before, 'lineno'):
+            count += max(stat.count_diff, 0)
+            size += max(stat.size_diff, 0)
+        return count, size
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """统计 with 块自身的墙钟时间与 CPU 时间，嵌套阶段的部分只计入嵌套阶段"""
+        timing = self.stats.phases.get(name)
+        if timing is None:
+            timing = self.stats.phases[name] = PhaseTiming()
+        children = [0.0, 0.0, 0, 0]
+        self._stack.append(children)
+        # 外层时间包含快照开销，从父阶段中扣除，使快照不计入任何阶段
+        outer_cpu = time.process_time()
+        outer_wall = time.perf_counter()
+        snapshot = self._snapshot() if self.trace_allocations else None
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            count = size = 0
+            if snapshot is not None:
+                count, size = self._allocated(snapshot, self._snapshot())
+            self._stack.pop()
+            timing.wall += wall - children[0]
+            timing.cpu += cpu - children[1]
+            timing.allocations += count - int(children[2])
+            timing.allocated_bytes += size - int(children[3])
+            timing.calls += 1
+            if self._stack:
+                parent = self._stack[-1]
+                parent[0] += time.perf_counter() - outer_wall
+                parent[1] += time.process_time() - outer_cpu
+                parent[2] += count
+                parent[3] += size
+
+    def _timed(self, name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with self.phase(name):
+                return method(*args, **kwargs)
+        return wrapper
+
+    def _counted(self, name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        counters = self.stats.counters
+        counters.setdefault(name, 0)
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            counters[name] += 1
+            return method(*args, **kwargs)
+        return wrapper
+
+    def _merge_counted(self, method: Callable[..., Any]) -> Callable[..., Any]:
+        counters = self.stats.counters
+        counters.setdefault('merge_attempts', 0)
+        counters.setdefault('merge_rejected', 0)
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            counters['merge_attempts'] += 1
+            merged = method(*args, **kwargs)
+            if merged is None:
+                counters['merge_rejected'] += 1
+            return merged
+        return wrapper
+
+    def attach(self, generator: Any) -> Any:
+        """为生成器实例装上统计包装并返回该生成器"""
+        for name in PHASES:
+            setattr(generator, name, self._timed(name, getattr(generator, name)))
+        generator.get_room = self._counted('get_room', generator.get_room)
+        generator._merge = self._merge_counted(generator._merge)
+        generate = generator.generate
+
+        def counted_generate() -> None:
+            start = time.perf_counter()
+            generate()
+            self.stats.wall += time.perf_counter() - start
+            self.stats.maps += 1
+        generator.generate = counted_generate
+        return generator
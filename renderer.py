@@ -1,21 +1,112 @@
-from typing import List, Optional, Tuple, Any
-from PIL import Image, ImageDraw
-from models import Room, Edge
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple, Any, Type
+from PIL import Image, ImageDraw, ImageFont
+from models import Room, Edge, RoomGrid
 from config import COLOR_MAP, MapConfig, DEFAULT_CONFIG
 
+class LabelCache:
+    """预先光栅化的文字标签缓存，按 (文字, 字体) 以 LRU 方式保留位图
+
+    多个线程可以共享同一缓存，查找与淘汰在锁内进行，光栅化在锁外进行。
+    """
+    
+    def __init__(self, max_size: int = 512) -> None:
+        self.max_size = max_size
+        self.labels: 'OrderedDict[Tuple[str, Any], Tuple[Tuple[int, int], Image.Image]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._default_font: Any = None
+        self.lock = threading.Lock()
+    
+    def get(self, text: str, font: Any = None) -> Tuple[Tuple[int, int], Image.Image]:
+        """获取标签位图及其相对绘制位置的偏移"""
+        with self.lock:
+            if font is None:
+                if self._default_font is None:
+                    self._default_font = ImageFont.load_default()
+                font = self._default_font
+            key = (text, font)
+            label = self.labels.get(key)
+            if label is not None:
+                self.hits += 1
+                self.labels.move_to_end(key)
+                return label
+            self.misses += 1
+        
+        measure = ImageDraw.Draw(Image.new('L', (1, 1)))
+        left, top, right, bottom = measure.textbbox((0, 0), text, font=font)
+        mask = Image.new('L', (max(right - left, 1), max(bottom - top, 1)), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font)
+        label = ((left, top), mask)
+        with self.lock:
+            self.labels[key] = label
+            self.labels.move_to_end(key)
+            while len(self.labels) > self.max_size:
+                self.labels.popitem(last=False)
+        return label
+    
+    def draw(self, draw: Any, pos: Tuple[int, int], text: str, 
+             fill: Any = (0, 0, 0), font: Any = None) -> None:
+        """将缓存的标签位图绘制到 pos 处，效果与 draw.text 相同"""
+        (dx, dy), mask = self.get(text, font)
+        draw.bitmap((pos[0] + dx, pos[1] + dy), mask, fill=fill)
+    
+    def stats(self) -> Dict[str, int]:
+        """返回缓存命中统计"""
+        with self.lock:
+            return {'size': len(self.labels), 'max_size': self.max_size,
+                    'hits': self.hits, 'misses': self.misses}
+    
+    def clear(self) -> None:
+        with self.lock:
+            self.labels.clear()
+            self.hits = self.misses = 0
+
+# 所有渲染器默认共享的标签缓存
+LABEL_CACHE = LabelCache()
+
+# 像素矩形 (左, 上, 右, 下)，右下不含
+Box = Tuple[int, int, int, int]
+
+
+def boxes_overlap(a: Box, b: Box) -> bool:
+    """判断两个右下不含的矩形是否相交"""
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
 class MapRenderer:
     """负责将地图渲染成图像"""
     
-    def __init__(self, width: int, height: int, config: MapConfig = DEFAULT_CONFIG) -> None:
+    def __init__(self, width: int, height: int, config: MapConfig = DEFAULT_CONFIG,
+                 label_cache: Optional[LabelCache] = None) -> None:
         self.width = width
         self.height = height
         self.config = config
+        self.label_cache = label_cache if label_cache is not None else LABEL_CACHE
         self.rooms: List[Room] = []
         self.edges: List[Edge] = []
+        self.grid = RoomGrid(width, height)
+        self.image: Optional[Image.Image] = None
+        # 标签超出房间矩形的房间，重绘它们时无法只覆盖房间区域
+        self.overflowing: Set[Room] = set()
+        # 上次渲染中各标签的包围盒 (左, 上, 右, 下)，右下不含，供局部重绘判断遮挡
+        self.label_boxes: Dict[Room, Box] = {}
+        self.empty_label_boxes: List[Box] = []
+
+    @classmethod
+    def from_map_data(cls, data: Any, config: MapConfig = DEFAULT_CONFIG) -> 'MapRenderer':
+        """从提供 width/height/to_rooms/to_edges 的地图数据创建渲染器"""
+        renderer = cls(data.width, data.height, config)
+        for room in data.to_rooms():
+            renderer.add_room(room)
+        for edge in data.to_edges():
+            renderer.add_edge(edge)
+        return renderer
 
     def add_room(self, room: Room) -> None:
         """添加房间到渲染列表"""
         self.rooms.append(room)
+        self.grid.place(room)
     
     def add_edge(self, edge: Edge) -> None:
         """添加边到渲染列表"""
@@ -35,11 +126,7 @@ class MapRenderer:
     
     def get_room(self, pos: Tuple[int, int]) -> Optional[Room]:
         """获取指定位置的房间"""
-        for room in self.rooms:
-            if pos[0] >= room.topLeft[0] and pos[0] < room.topLeft[0] + room.size[0] and \
-               pos[1] >= room.topLeft[1] and pos[1] < room.topLeft[1] + room.size[1]:
-                return room
-        return None
+        return self.grid.get(pos)
     
     def draw_edges(self, draw: Any) -> None:
         """绘制边缘连接"""
@@ -59,57 +146,131 @@ class MapRenderer:
             draw.line([start_left, start_top, end_left, end_top], 
                      fill='#00008B', width=self.config.edge_width)
     
-    def draw_rooms(self, draw: Any) -> None:
-        """绘制房间"""
+    def room_fills(self) -> Dict[Room, str]:
+        """各房间的填充颜色，COLOR_MAP 中没有的类型按房间顺序使用逐渐变深的灰色"""
+        fills = {}
         default_color = 0xAEA8A5
         for room in self.rooms:
             color = COLOR_MAP.get(room.color)
-            if not color: 
+            if not color:
                 color = f'#{default_color:06x}'
                 default_color -= 0x040404
-            
-            cell_width, cell_height = self.get_grid_cell_size(room.topLeft)
-            left, top = self.get_grid_cell_topLeft(room.topLeft)
-            right = left + cell_width * room.size[0]
-            bottom = top + cell_height * room.size[1]
-            
-            # 应用边距
+            fills[room] = color
+        return fills
+
+    def draw_rooms(self, draw: Any) -> None:
+        """绘制房间"""
+        for room, color in self.room_fills().items():
+            self.draw_room(draw, room, color)
+
+    def cell_rect(self, top_left: Tuple[int, int], size: Tuple[int, int]) -> Box:
+        """计算单元格区域扣除边距后的矩形，右下包含在内（与 draw.rectangle 一致）"""
+        cell_width, cell_height = self.get_grid_cell_size(top_left)
+        left, top = self.get_grid_cell_topLeft(top_left)
+        right = left + cell_width * size[0]
+        bottom = top + cell_height * size[1]
+
+        # 应用边距
+        margin = self.config.object_margin
+        return left + margin, top + margin, right - margin, bottom - margin
+
+    def draw_label(self, draw: Any, pos: Tuple[int, int], label: str) -> Box:
+        """绘制标签并返回其包围盒"""
+        self.label_cache.draw(draw, pos, label)
+        (dx, dy), mask = self.label_cache.get(label)
+        return (pos[0] + dx, pos[1] + dy, pos[0] + dx + mask.size[0], pos[1] + dy + mask.size[1])
+
+    def draw_room(self, draw: Any, room: Room, color: str) -> None:
+        """绘制单个房间及其标签"""
+        left, top, right, bottom = self.cell_rect(room.topLeft, room.size)
+        draw.rectangle([left, top, right, bottom], fill=color)
+        if self.config.show_labels:
+            label = f'{room.color}\n{room.description}' if self.config.show_descriptions \
+                else room.color
             margin = self.config.object_margin
-            left, top = left + margin, top + margin
-            right, bottom = right - margin, bottom - margin
-            
-            draw.rectangle([left, top, right, bottom], fill=color)
-            draw.text((left + margin, top + margin), 
-                     f'{room.color}\n{room.description}', fill=(0, 0, 0))
-    
+            box = self.draw_label(draw, (left + margin, top + margin), label)
+            self.label_boxes[room] = box
+            if box[2] > right + 1 or box[3] > bottom + 1:
+                self.overflowing.add(room)
+            else:
+                self.overflowing.discard(room)
+
     def draw_empty_cells(self, draw: Any) -> None:
         """绘制空单元格"""
         for x in range(1, self.width + 1):
             for y in range(1, self.height + 1):
                 if not self.get_room((x, y)):
-                    cell_width, cell_height = self.get_grid_cell_size((x, y))
-                    left, top = self.get_grid_cell_topLeft((x, y))
-                    right = left + cell_width
-                    bottom = top + cell_height
-                    
-                    # 应用边距
-                    margin = self.config.object_margin
-                    left, top = left + margin, top + margin
-                    right, bottom = right - margin, bottom - margin
-                    
+                    left, top, right, bottom = self.cell_rect((x, y), (1, 1))
                     draw.rectangle([left, top, right, bottom], fill=(240, 240, 240))
-                    draw.text((left + margin, top + margin), 
-                            'empty', fill=(0, 0, 0))
-    
+                    if self.config.show_labels:
+                        margin = self.config.object_margin
+                        self.empty_label_boxes.append(
+                            self.draw_label(draw, (left + margin, top + margin), 'empty'))
+
     def render(self) -> Image.Image:
         """渲染完整地图"""
         img = Image.new('RGB', 
                        (self.config.map_length, self.config.map_length), 
                        (255, 255, 255))
         draw = ImageDraw.Draw(img)
+        self.label_boxes.clear()
+        self.empty_label_boxes.clear()
         
         self.draw_edges(draw)
         self.draw_rooms(draw)
         self.draw_empty_cells(draw)
         
-        return img 
\ No newline at end of file
+        self.image = img
+        return img
+    
+    def redraw_rooms(self, rooms: List[Room]) -> Image.Image:
+        """在上次渲染结果的副本上只重绘给定房间，房间位置与大小必须未变
+
+        重绘会覆盖房间矩形内的全部像素，因此新旧标签超出房间矩形，
+        或其他房间、空单元格的标签伸入这些房间的矩形时，退回完整渲染。
+        """
+        if self.image is None or self._redraw_conflicts(rooms):
+            return self.render()
+        img = self.image.copy()
+        draw = ImageDraw.Draw(img)
+        fills = self.room_fills()
+        for room in rooms:
+            self.draw_room(draw, room, fills[room])
+        if any(room in self.overflowing for room in rooms):
+            return self.render()
+        self.image = img
+        return img
+
+    def _redraw_conflicts(self, rooms: List[Room]) -> bool:
+        """判断重绘给定房间是否会与上次渲染的其他标签相互覆盖"""
+        changed = set(rooms)
+        if changed & self.overflowing:
+            return True
+        for room in rooms:
+            left, top, right, bottom = self.cell_rect(room.topLeft, room.size)
+            rect = (left, top, right + 1, bottom + 1)
+            if any(boxes_overlap(rect, box) for box in self.empty_label_boxes):
+                return True
+            if any(other not in changed and boxes_overlap(rect, box)
+                   for other, box in self.label_boxes.items()):
+                return True
+        return False
+
+def get_renderer_class(config: MapConfig = DEFAULT_CONFIG) -> Type[Any]:
+    """根据 config.renderer 选择渲染器实现，默认使用 PIL
+
+    NumPy 后端不绘制文字，show_labels 为 True 时拒绝使用，避免静默输出无标签的地图。
+    """
+    if config.renderer == 'pil':
+        return MapRenderer
+    if config.renderer == 'numpy':
+        if config.show_labels:
+            raise ValueError("The numpy renderer does not draw labels; set show_labels=False")
+        from numpy_renderer import NumpyMapRenderer
+        return NumpyMapRenderer
+    raise ValueError(f"Unknown renderer: {config.renderer}")
+
+
+def create_renderer(width: int, height: int, config: MapConfig = DEFAULT_CONFIG) -> Any:
+    """创建 config 指定的渲染器"""
+    return get_renderer_class(config)(width, height, config)
@@ -0,0 +1,94 @@
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from models import Room
+
+
+class RoomGraph:
+    """房间连通图，缓存邻居、度数与各起点的广度优先搜索结果
+
+    最短路径只保存父指针，路径在需要时沿父指针回溯重建。
+    房间的边在生成后不再变化，只有合并房间会使缓存失效，见 merge。
+    """
+
+    def __init__(self, rooms: Iterable[Room], neighbors: Callable[[Room], List[Room]]) -> None:
+        self.rooms = rooms
+        self._neighbors_of = neighbors
+        self._neighbors: Dict[Room, List[Room]] = {}
+        self._searches: Dict[Room, Tuple[Dict[Room, int], Dict[Room, Optional[Room]]]] = {}
+
+    def invalidate(self) -> None:
+        """房间或连接发生变化后清除缓存"""
+        self._neighbors.clear()
+        self._searches.clear()
+
+    def merge(self, members: Iterable[Room]) -> None:
+        """在合并 members 之前调用，清除它们及其相邻房间的缓存"""
+        for member in members:
+            for neighbor in self.neighbors(member):
+                self._neighbors.pop(neighbor, None)
+            del self._neighbors[member]
+        self._searches.clear()
+
+    def neighbors(self, room: Room) -> List[Room]:
+        """获取与房间相连的房间，返回的列表为缓存，不应修改"""
+        cached = self._neighbors.get(room)
+        if cached is None:
+            cached = self._neighbors[room] = self._neighbors_of(room)
+        return cached
+
+    def degree(self, room: Room) -> int:
+        """获取房间的相邻房间数"""
+        return len(self.neighbors(room))
+
+    def is_leaf(self, room: Room) -> bool:
+        """检查房间是否为叶子节点（只有一个相邻房间）"""
+        return self.degree(room) == 1
+
+    def leaves(self) -> List[Room]:
+        """获取所有叶子房间"""
+        return [room for room in self.rooms if self.is_leaf(room)]
+
+    def bfs(self, source: Room) -> Tuple[Dict[Room, int], Dict[Room, Optional[Room]]]:
+        """从 source 出发的广度优先搜索，返回 (距离, 父指针)"""
+        cached = self._searches.get(source)
+        if cached is not None:
+            return cached
+
+        distances = {source: 0}
+        parents: Dict[Room, Optional[Room]] = {source: None}
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            for neighbor in self.neighbors(current):
+                if neighbor not in distances:
+                    distances[neighbor] = distances[current] + 1
+                    parents[neighbor] = current
+                    queue.append(neighbor)
+
+        self._searches[source] = (distances, parents)
+        return distances, parents
+
+    def distances(self, source: Room) -> Dict[Room, int]:
+        """获取从 source 可达的各房间的距离"""
+        return self.bfs(source)[0]
+
+    def path(self, source: Room, target: Room) -> List[Room]:
+        """获取 source 到 target 的最短路径（含两端），不可达时返回空列表"""
+        parents = self.bfs(source)[1]
+        if target not in parents:
+            return []
+        path: List[Room] = []
+        current: Optional[Room] = target
+        while current is not None:
+            path.append(current)
+            current = parents[current]
+        path.reverse()
+        return path
+
+    def all_pairs_distances(self) -> Dict[Room, Dict[Room, int]]:
+        """获取所有房间两两之间的距离"""
+        return {room: self.distances(room) for room in self.rooms}
+
+    def eccentricity(self, room: Room) -> int:
+        """获取房间到其可达的最远房间的距离"""
+        return max(self.distances(room).values())
@@ -0,0 +1,187 @@
+"""本地地图服务，按 (MapConfig, seed) 生成、渲染并缓存地图
+
+    python service.py --port 8765
+
+接口（配置字段均以查询参数给出，省略时使用 MapConfig 默认值）：
+    GET /map?seed=1&grid_width=7     地图数据 JSON（MapData.to_dict）
+    GET /render?seed=1&grid_width=7  PNG 图像
+    GET /stats                       缓存命中统计 JSON
+
+数值字段超出 FIELD_LIMITS 的范围时返回 400。
+"""
+import argparse
+import io
+import json
+from dataclasses import astuple, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+from batch import generate_map
+from map_data import MapData
+from renderer import get_renderer_class
+from structures import LRUCache
+from config import MapConfig
+
+# 影响生成结果的配置字段，其余字段只影响渲染
+GENERATION_FIELDS = ('grid_width', 'grid_height', 'merge_chance')
+
+_FIELD_TYPES = {f.name: f.type for f in fields(MapConfig)}
+
+# 请求中数值字段的取值范围，超出时返回 400，避免单个请求生成或渲染过大的地图
+FIELD_LIMITS: Dict[str, Tuple[float, float]] = {
+    'generator_count': (1, 64),
+    'grid_width': (1, 64),
+    'grid_height': (1, 64),
+    'merge_chance': (0, 1),
+    'map_length': (16, 4096),
+    'page_margin': (0, 1024),
+    'object_margin': (0, 256),
+    'edge_width': (0, 256),
+}
+
+
+def _parse_value(name: str, value: str) -> Any:
+    field_type = _FIELD_TYPES[name]
+    if field_type is bool:
+        if value.lower() in ('1', 'true', 'yes'):
+            return True
+        if value.lower() in ('0', 'false', 'no'):
+            return False
+        raise ValueError(f"Invalid boolean for {name}: {value}")
+    return field_type(value)
+
+
+def parse_request(query: str) -> Tuple[MapConfig, int]:
+    """从查询字符串解析配置与种子，参数不合法时抛出 ValueError"""
+    params = {name: values[-1] for name, values in parse_qs(query).items()}
+    if 'seed' not in params:
+        raise ValueError("Missing seed")
+    seed = int(params.pop('seed'))
+    unknown = set(params) - set(_FIELD_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    config = MapConfig(**{name: _parse_value(name, value) for name, value in params.items()})
+    for name, (low, high) in FIELD_LIMITS.items():
+        if not low <= getattr(config, name) <= high:
+            raise ValueError(f"{name} must be between {low} and {high}")
+    get_renderer_class(config)
+    return config, seed
+
+
+def render_png(config: MapConfig, data: MapData) -> bytes:
+    """渲染地图并编码为 PNG"""
+    image = get_renderer_class(config).from_map_data(data, config).render()
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def map_key(config: MapConfig, seed: int) -> Tuple[Any, ...]:
+    """地图数据的缓存键"""
+    return tuple(getattr(config, name) for name in GENERATION_FIELDS) + (seed,)
+
+
+def image_key(config: MapConfig, seed: int) -> Tuple[Any, ...]:
+    """PNG 的缓存键"""
+    return astuple(config) + (seed,)
+
+
+class MapService:
+    """带 LRU 缓存的地图生成与渲染
+
+    地图数据只按影响生成的字段与种子缓存，不同渲染参数共享同一份地图；
+    PNG 按完整配置与种子缓存。
+    """
+
+    def __init__(self, max_maps: int = 4096, max_images: int = 256) -> None:
+        self.maps: LRUCache[Tuple[Any, ...], MapData] = LRUCache(max_maps)
+        self.images: LRUCache[Tuple[Any, ...], bytes] = LRUCache(max_images)
+
+    def get_map(self, config: MapConfig, seed: int) -> MapData:
+        key = map_key(config, seed)
+        data = self.maps.get(key)
+        if data is None:
+            data = generate_map(config, seed)
+            self.maps.put(key, data)
+        return data
+
+    def get_png(self, config: MapConfig, seed: int) -> bytes:
+        key = image_key(config, seed)
+        png = self.images.get(key)
+        if png is None:
+            png = render_png(config, self.get_map(config, seed))
+            self.images.put(key, png)
+        return png
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {'maps': self.maps.stats(), 'images': self.images.stats()}
+
+
+class MapRequestHandler(BaseHTTPRequestHandler):
+    """将 HTTP 请求转发给 server.service"""
+
+    server: 'MapServer'
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        service = self.server.service
+        try:
+            if url.path == '/stats':
+                self._send(200, 'application/json', json.dumps(service.stats()).encode())
+            elif url.path == '/map':
+                config, seed = parse_request(url.query)
+                body = json.dumps(service.get_map(config, seed).to_dict()).encode()
+                self._send(200, 'application/json', body)
+            elif url.path == '/render':
+                config, seed = parse_request(url.query)
+                self._send(200, 'image/png', service.get_png(config, seed))
+            else:
+                self._send(404, 'application/json', json.dumps({'error': 'Not found'}).encode())
+        except (TypeError, ValueError) as e:
+            self._send(400, 'application/json', json.dumps({'error': str(e)}).encode())
+        except Exception as e:
+            # 生成或渲染中的其他异常（如 OverflowError、MemoryError）返回 500 而不是断开连接
+            self._send(500, 'application/json', json.dumps({'error': repr(e)}).encode())
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class MapServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: MapService, verbose: bool = False) -> None:
+        super().__init__(address, MapRequestHandler)
+        self.service = service
+        self.verbose = verbose
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Local map generation service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-maps', type=int, default=4096)
+    parser.add_argument('--max-images', type=int, default=256)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    server = MapServer((args.host, args.port), MapService(args.max_maps, args.max_images), args.verbose)
+    print(f'Serving on http://{args.host}:{server.server_address[1]}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import math
+import random
+import threading
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar('T', bound=Hashable)
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+class IndexedSet(Generic[T]):
+    """支持 O(1) 增删与随机选取的集合，删除时用末尾元素填补空位"""
+    
+    def __init__(self, items: Iterable[T] = ()) -> None:
+        self.items: List[T] = []
+        self.positions: Dict[T, int] = {}
+        for item in items:
+            self.add(item)
+    
+    def add(self, item: T) -> None:
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+    
+    def discard(self, item: T) -> None:
+        index = self.positions.pop(item, None)
+        if index is None:
+            return
+        last = self.items.pop()
+        if index < len(self.items):
+            self.items[index] = last
+            self.positions[last] = index
+    
+    def remove(self, item: T) -> None:
+        if item not in self.positions:
+            raise KeyError(item)
+        self.discard(item)
+    
+    def choice(self, rng: random.Random) -> T:
+        """等概率随机选取一个元素"""
+        return self.items[rng.randrange(len(self.items))]
+    
+    def __contains__(self, item: object) -> bool:
+        return item in self.positions
+    
+    def __len__(self) -> int:
+        return len(self.items)
+    
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.items)
+
+
+class LRUCache(Generic[K, V]):
+    """线程安全的定长 LRU 缓存，超出容量时淘汰最久未使用的条目"""
+    
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.entries: 'OrderedDict[K, V]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+    
+    def get(self, key: K) -> Optional[V]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+    
+    def put(self, key: K, value: V) -> None:
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """返回缓存命中统计"""
+        with self.lock:
+            return {'size': len(self.entries), 'max_size': self.max_size,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+    
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self.entries
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class BloomFilter:
+    """定长位数组上的布隆过滤器，元素为 64 位整数哈希
+
+    按容量与误判率计算位数和哈希次数，位置由哈希的高低 32 位做双重哈希得到。
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 1e-6) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, value: int) -> Iterator[int]:
+        h1 = (value >> 32) & 0xFFFFFFFF
+        h2 = (value & 0xFFFFFFFF) | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+    
+    def add(self, value: int) -> bool:
+        """加入元素，返回加入前是否可能已存在"""
+        present = True
+        bits = self.bits
+        for pos in self._positions(value):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+        if not present:
+            self.count += 1
+        return present
+    
+    def __contains__(self, value: object) -> bool:
+        if not isinstance(value, int):
+            return False
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+    
+    def __len__(self) -> int:
+        """已加入的不同元素数（近似）"""
+        return self.count
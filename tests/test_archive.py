@@ -0,0 +1,38 @@
+"""归档的零拷贝视图与种子查找"""
+import gc
+import os
+import pytest
+from batch import derive_seed, generate_map
+from archive import MapArchive, build_archive
+from config import MapConfig
+
+
+@pytest.fixture(scope='module')
+def maps() -> list:
+    config = MapConfig(grid_width=5, grid_height=5)
+    return [generate_map(config, derive_seed(4, i)) for i in range(20)]
+
+
+def test_archive_views(tmp_path, maps: list) -> None:
+    path = os.path.join(tmp_path, 'archive.bin')
+    assert build_archive(path, maps) == len(maps)
+    with MapArchive(path) as archive:
+        for i, data in enumerate(maps):
+            view = archive[i]
+            assert view.seed == data.seed
+            assert list(view.distances) == list(data.distances)
+            assert view.to_map_data() == data
+        assert archive.by_seed(maps[7].seed).to_map_data() == maps[7]
+        with pytest.raises(KeyError):
+            archive.by_seed(12345)
+
+
+def test_archive_close_with_live_view(tmp_path, maps: list) -> None:
+    path = os.path.join(tmp_path, 'archive.bin')
+    build_archive(path, maps)
+    archive = MapArchive(path)
+    view = archive[2]
+    archive.close()  # 视图仍引用映射时不应抛出异常
+    assert view.to_map_data() == maps[2]
+    del view
+    gc.collect()
@@ -0,0 +1,26 @@
+"""异步服务的请求合并"""
+import asyncio
+import time
+from async_service import AsyncMapService
+
+
+def test_cancelled_first_request_keeps_inflight_job() -> None:
+    async def scenario() -> AsyncMapService:
+        service = AsyncMapService(workers=1)
+        key = ('map', ('slow',))
+        try:
+            # 任务耗时固定，取消与后续请求都发生在它完成之前
+            first = asyncio.ensure_future(service._compute(key, time.sleep, 0.5))
+            await asyncio.sleep(0.05)
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+            assert service.queue_depth == 1
+            await service._compute(key, time.sleep, 0.5)
+        finally:
+            service.executor.shutdown()
+        return service
+
+    service = asyncio.run(scenario())
+    assert service.metrics['computed'] == 1
+    assert service.metrics['coalesced'] == 1
+    assert service.queue_depth == 0
@@ -0,0 +1,42 @@
+"""流式总览图的尺寸校验"""
+import os
+import pytest
+from PIL import Image
+from batch import derive_seed, generate_map
+from collage import iter_collage_strips, render_collage, write_collage
+from config import MapConfig
+
+CONFIG = MapConfig(grid_width=5, grid_height=5)
+
+
+def maps(count: int) -> list:
+    return [generate_map(CONFIG, derive_seed(0, i)) for i in range(count)]
+
+
+@pytest.mark.parametrize('name', ['sheet.png', 'sheet.ppm'])
+def test_write_collage(tmp_path, name: str) -> None:
+    path = os.path.join(tmp_path, name)
+    size = write_collage(path, iter(maps(5)), 5, CONFIG, columns=2, margin=4, thumbnail=32)
+    with Image.open(path) as image:
+        image.load()
+        assert image.size == size == (2 * 36 + 4, 3 * 36 + 4)
+
+
+@pytest.mark.parametrize('given', [3, 6])
+def test_write_collage_rejects_wrong_count(tmp_path, given: int) -> None:
+    path = os.path.join(tmp_path, 'sheet.png')
+    with pytest.raises(ValueError):
+        write_collage(path, iter(maps(given)), 5, CONFIG, columns=2, thumbnail=32)
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize('margin', [0, 4])
+def test_empty_collage_is_rejected(tmp_path, margin: int) -> None:
+    path = os.path.join(tmp_path, 'sheet.png')
+    with pytest.raises(ValueError):
+        write_collage(path, iter([]), 0, CONFIG, margin=margin, thumbnail=32)
+    assert not os.path.exists(path)
+    with pytest.raises(ValueError):
+        render_collage([], CONFIG, margin=margin, thumbnail=32)
+    with pytest.raises(ValueError):
+        list(iter_collage_strips(iter([]), 0, CONFIG, margin=margin, thumbnail=32))
@@ -0,0 +1,24 @@
+"""约束筛选的结果"""
+from constraints import MapConstraints, generate_constrained
+from map_data import FLAG_LEAF
+from config import MapConfig, RoomType, ROOM_TYPE_CODES
+
+CONFIG = MapConfig(grid_width=5, grid_height=5)
+
+
+def test_accepted_maps_satisfy_constraints() -> None:
+    constraints = MapConstraints(min_boss_distance=5, require_shop=True, max_leaves=6)
+    maps, stats = generate_constrained(CONFIG, constraints, count=10, seed=1)
+    assert len(maps) == stats.accepted == 10
+    assert stats.attempts == stats.accepted + sum(stats.rejections.values())
+    for data in maps:
+        types = list(data.room_types)
+        assert ROOM_TYPE_CODES[RoomType.SHOP] in types
+        boss = types.index(ROOM_TYPE_CODES[RoomType.BOSS])
+        assert data.distances[boss] >= 5
+        assert sum(1 for flags in data.flags if flags & FLAG_LEAF) <= 6
+
+
+def test_default_constraints_accept_everything() -> None:
+    maps, stats = generate_constrained(CONFIG, count=5, seed=2)
+    assert len(maps) == stats.attempts == 5
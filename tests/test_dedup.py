@@ -0,0 +1,75 @@
+"""规范哈希的对称不变性与流式去重"""
+import itertools
+from typing import Tuple
+import pytest
+from batch import derive_seed, generate_map
+from dedup import Deduplicator, canonical_hash, canonical_key, unique_maps
+from map_data import MapData
+from models import Room, Edge
+from config import MapConfig, RoomType
+
+SYMMETRIES = list(itertools.product((False, True), repeat=3))  # (转置, 水平翻转, 垂直翻转)
+
+
+def transform(data: MapData, transpose: bool, flip_x: bool, flip_y: bool) -> MapData:
+    """按对称变换重建地图，房间顺序也随之打乱"""
+    width, height = (data.height, data.width) if transpose else (data.width, data.height)
+
+    def move(pos: Tuple[int, int]) -> Tuple[int, int]:
+        x, y = (pos[1], pos[0]) if transpose else pos
+        return (width + 1 - x if flip_x else x, height + 1 - y if flip_y else y)
+
+    rooms = []
+    for room in reversed(data.to_rooms()):
+        corners = [move(room.topLeft),
+                   move((room.topLeft[0] + room.size[0] - 1, room.topLeft[1] + room.size[1] - 1))]
+        size = (room.size[1], room.size[0]) if transpose else room.size
+        rooms.append(Room((min(c[0] for c in corners), min(c[1] for c in corners)), size, room.color))
+    edges = []
+    for edge in data.to_edges():
+        end = (edge.start[0] + 1, edge.start[1]) if edge.direction == 'Horizontal' \
+            else (edge.start[0], edge.start[1] + 1)
+        start, end = sorted((move(edge.start), move(end)), key=lambda pos: (pos[1], pos[0]))
+        edges.append(Edge(start, 'Horizontal' if start[1] == end[1] else 'Vertical'))
+    return MapData.from_rooms(width, height, rooms, edges)
+
+
+@pytest.mark.parametrize('grid', [(5, 5), (4, 7)])
+def test_canonical_key_is_invariant_under_symmetries(grid: Tuple[int, int]) -> None:
+    config = MapConfig(grid_width=grid[0], grid_height=grid[1])
+    for i in range(30):
+        data = generate_map(config, derive_seed(9, i))
+        key = canonical_key(data)
+        for symmetry in SYMMETRIES:
+            moved = transform(data, *symmetry)
+            assert canonical_key(moved) == key
+            assert canonical_hash(moved) == canonical_hash(data)
+
+
+def test_canonical_key_distinguishes_types_and_layout() -> None:
+    config = MapConfig(grid_width=5, grid_height=5)
+    data = generate_map(config, 1)
+    changed = MapData.from_rooms(data.width, data.height, data.to_rooms(), data.to_edges())
+    changed.room_types[0] = (changed.room_types[0] + 1) % 8
+    assert canonical_key(changed) != canonical_key(data)
+    assert canonical_key(changed, include_types=False) == canonical_key(data, include_types=False)
+    assert canonical_key(generate_map(config, 2)) != canonical_key(data)
+
+
+@pytest.mark.parametrize('size', [300, 500])
+def test_canonical_key_on_large_grids(size: int) -> None:
+    rooms = [Room((1, 1), (2, 1), RoomType.START), Room((size, size - 2), (1, 2), RoomType.BOSS)]
+    data = MapData.from_rooms(size, size - 1, rooms, [Edge((2, 1), 'Horizontal')])
+    key = canonical_key(data)
+    assert len(key) == 4 + size * (size - 1)
+    assert canonical_key(transform(data, True, True, False)) == key
+
+
+@pytest.mark.parametrize('capacity', [None, 1000])
+def test_deduplicator_drops_symmetric_copies(capacity) -> None:
+    config = MapConfig(grid_width=5, grid_height=5)
+    maps = [generate_map(config, derive_seed(5, i)) for i in range(20)]
+    stream = maps + [transform(data, True, False, True) for data in maps]
+    deduplicator = Deduplicator(capacity)
+    assert list(unique_maps(stream, deduplicator)) == maps
+    assert deduplicator.stats() == {'checked': 40, 'unique': 20, 'duplicates': 20}
@@ -0,0 +1,33 @@
+"""MapData 从生成器转换的结果"""
+import random
+from map_generator import MapGenerator
+from map_data import MapData, FLAG_LEAF, FLAG_MAIN_PATH
+from config import MapConfig, RoomType, ROOM_TYPE_CODES
+
+
+def generate(seed: int) -> MapGenerator:
+    generator = MapGenerator(MapConfig(grid_width=5, grid_height=5), random.Random(seed))
+    generator.generate()
+    return generator
+
+
+def test_from_generator_ignores_descriptions() -> None:
+    for seed in range(50):
+        generator = generate(seed)
+        expected = MapData.from_rooms(generator.width, generator.height,
+                                      generator.pending_room, generator.edges, seed)
+        for room in generator.pending_room:
+            room.description = 'label format changed 99'
+        assert MapData.from_generator(generator, seed) == expected
+
+
+def test_from_generator_reads_generator_state() -> None:
+    generator = generate(7)
+    data = MapData.from_generator(generator)
+    boss = next(room for room in generator.pending_room if room.color == RoomType.BOSS)
+    main_path = set(generator.get_path_to_start(boss))
+    for i, room in enumerate(generator.pending_room):
+        assert data.room_types[i] == ROOM_TYPE_CODES[room.color]
+        assert data.distances[i] == generator.distance_to_start.get(room, -1)
+        assert bool(data.flags[i] & FLAG_LEAF) == generator.is_room_leaf(room)
+        assert bool(data.flags[i] & FLAG_MAIN_PATH) == (room in main_path)
@@ -0,0 +1,60 @@
+"""二进制地图文件与归档的读写往返"""
+import os
+import pytest
+from batch import derive_seed, generate_map
+from map_data import MapData
+from map_format import (encode_map, decode_map, save_maps, load_maps, save_json, load_json,
+                        MapFile)
+from config import MapConfig
+
+
+@pytest.fixture(scope='module')
+def maps() -> list:
+    config = MapConfig(grid_width=5, grid_height=5)
+    result = [generate_map(config, derive_seed(3, i)) for i in range(20)]
+    result.append(MapData.empty(4, 3))  # 没有种子也没有房间的记录
+    return result
+
+
+def test_encode_decode_round_trip(maps: list) -> None:
+    for data in maps:
+        buf = b'padding' + encode_map(data)
+        assert decode_map(buf, len(b'padding')) == data
+
+
+def test_map_file_index_and_seed(tmp_path, maps: list) -> None:
+    path = os.path.join(tmp_path, 'maps.bin')
+    assert save_maps(path, maps) == len(maps)
+    with load_maps(path) as map_file:
+        assert len(map_file) == len(maps)
+        assert list(map_file) == maps
+        assert map_file[-1] == maps[-1]
+        with pytest.raises(IndexError):
+            map_file[len(maps)]
+        assert map_file.by_seed(maps[5].seed) == maps[5]
+        with pytest.raises(KeyError):
+            map_file.by_seed(12345)
+
+
+def test_empty_file(tmp_path) -> None:
+    path = os.path.join(tmp_path, 'empty.bin')
+    assert save_maps(path, []) == 0
+    with MapFile(path) as map_file:
+        assert len(map_file) == 0
+        assert list(map_file) == []
+        with pytest.raises(KeyError):
+            map_file.by_seed(0)
+
+
+def test_rejects_other_files(tmp_path) -> None:
+    path = os.path.join(tmp_path, 'other.bin')
+    with open(path, 'wb') as file:
+        file.write(b'\0' * 64)
+    with pytest.raises(ValueError):
+        MapFile(path)
+
+
+def test_json_round_trip(tmp_path, maps: list) -> None:
+    path = os.path.join(tmp_path, 'maps.json')
+    save_json(path, maps)
+    assert load_json(path) == maps
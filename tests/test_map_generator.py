@@ -0,0 +1,58 @@
+"""布局检查点与类型重掷"""
+import copy
+import random
+import pytest
+from map_generator import MapGenerator
+from config import MapConfig
+
+CONFIG = MapConfig(grid_width=6, grid_height=5)
+
+
+def generate(seed: int) -> MapGenerator:
+    generator = MapGenerator(CONFIG, random.Random(seed))
+    generator.generate()
+    return generator
+
+
+def test_checkpoint_requires_base_map() -> None:
+    with pytest.raises(ValueError):
+        MapGenerator(CONFIG).checkpoint()
+
+
+def test_from_checkpoint_rejects_other_grid() -> None:
+    checkpoint = generate(0).checkpoint()
+    with pytest.raises(ValueError):
+        MapGenerator.from_checkpoint(checkpoint, MapConfig(grid_width=5, grid_height=5))
+
+
+def test_base_map_checkpoint_resumes_generation() -> None:
+    for seed in range(20):
+        generator = MapGenerator(CONFIG, random.Random(seed))
+        generator.generate_base_map()
+        checkpoint = generator.checkpoint()
+        assert checkpoint.rooms is None
+        resumed = MapGenerator.from_checkpoint(checkpoint, CONFIG, copy.deepcopy(generator.rng))
+        generator.generate()
+        resumed.generate()
+        assert resumed.to_map_data() == generator.to_map_data()
+
+
+def test_merged_checkpoint_keeps_layout() -> None:
+    for seed in range(20):
+        generator = generate(seed)
+        checkpoint = generator.checkpoint()
+        assert len(checkpoint.rooms) == len(generator.pending_room)
+        restored = MapGenerator.from_checkpoint(checkpoint, CONFIG, random.Random(seed + 1))
+        restored.generate()
+        assert restored.checkpoint() == checkpoint
+
+
+def test_reroll_types_matches_fresh_typing() -> None:
+    for seed in range(20):
+        generator = generate(seed)
+        checkpoint = generator.checkpoint()
+        generator.reroll_types(random.Random(seed + 1))
+        restored = MapGenerator.from_checkpoint(checkpoint, CONFIG, random.Random(seed + 1))
+        restored.generate()
+        assert generator.to_map_data() == restored.to_map_data()
+        assert generator.checkpoint() == checkpoint
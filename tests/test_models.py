@@ -0,0 +1,53 @@
+"""Room 作为字典键时的标识与哈希"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+import pytest
+from models import Room
+from config import RoomType
+
+
+def test_rooms_get_distinct_ids_and_hashes() -> None:
+    rooms = [Room((1, 1), (1, 1), RoomType.PENDING) for _ in range(1000)]
+    assert len({room.id for room in rooms}) == len(rooms)
+    assert len({hash(room) for room in rooms}) == len(rooms)
+    # 位置、尺寸与类型都相同的房间仍然互不相等
+    assert rooms[0] != rooms[1]
+
+
+def test_hash_and_eq_survive_mutation() -> None:
+    room = Room((2, 3), (1, 2), RoomType.PENDING)
+    distances = {room: 4}
+    before = hash(room)
+    room.color = RoomType.BOSS
+    room.description = 'changed'
+    assert hash(room) == before
+    assert distances[room] == 4
+    assert room == Room((9, 9), (1, 1), RoomType.BATTLE, id=room.id)
+
+
+def test_dict_of_rooms_uses_separate_slots() -> None:
+    """哈希取低位后互不冲突，字典查询不会退化为探测链"""
+    for count in (10, 1000, 100000):
+        rooms = [Room((i % 50 + 1, i // 50 + 1), (1, 1), RoomType.PENDING) for i in range(count)]
+        mask = (1 << count.bit_length()) - 1  # 不小于 count 的 2 的幂减一
+        assert len({hash(room) & mask for room in rooms}) == count
+        distances = {room: i for i, room in enumerate(rooms)}
+        assert len(distances) == count
+        assert all(distances[room] == i for i, room in enumerate(rooms))
+
+
+def make_rooms(count: int) -> List[Room]:
+    return [Room((1, 1), (1, 1), RoomType.PENDING) for _ in range(count)]
+
+
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_rooms_from_worker_processes_stay_distinct(method: str) -> None:
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f'{method} is not available')
+    parent = make_rooms(100)
+    context = multiprocessing.get_context(method)
+    with ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+        batches = list(executor.map(make_rooms, [100] * 4))
+    rooms = parent + [room for batch in batches for room in batch]
+    assert len(set(rooms)) == len(rooms)
@@ -0,0 +1,177 @@
+"""NumPy 批量内核生成的地图满足与 MapGenerator 相同的结构规则
+
+生成规则允许起点只连一条边，因此被起点隔开的单元格可能不连通，地图也可能没有 Boss，
+或起点被休息房间覆盖；这些情况的出现频率与 MapGenerator 对比检查。
+"""
+import random
+from collections import Counter
+from typing import Dict, List
+import numpy as np
+import pytest
+from map_generator import MapGenerator
+from map_data import MapData, FLAG_LEAF, FLAG_MAIN_PATH, EDGE_RIGHT, EDGE_DOWN
+from numpy_batch import MapBatch, NO_ROOM, generate_arrays
+from config import MapConfig, RoomType, ROOM_TYPE_CODES, ROOM_TYPE_NAMES
+
+CASES = [(3, 3, 0), (5, 5, 1), (7, 4, 2), (13, 13, 3)]
+
+START, SHOP, BOSS, REST = (ROOM_TYPE_CODES[t] for t in
+                           (RoomType.START, RoomType.SHOP, RoomType.BOSS, RoomType.REST))
+
+
+def room_adjacency(data: MapData) -> Dict[int, List[int]]:
+    """按边连接的房间邻接表，房间内部的边不计入"""
+    rooms = data.cell_rooms()
+    adjacency: Dict[int, List[int]] = {i: [] for i in range(data.room_count)}
+    for y in range(1, data.height + 1):
+        for x in range(1, data.width + 1):
+            bits = data.edge_bits((x, y))
+            here = rooms[(y - 1) * data.width + x - 1]
+            for flag, (nx, ny) in ((EDGE_RIGHT, (x + 1, y)), (EDGE_DOWN, (x, y + 1))):
+                there = rooms[(ny - 1) * data.width + nx - 1] if bits & flag else here
+                if there != here:
+                    adjacency[here].append(there)
+                    adjacency[there].append(here)
+    return adjacency
+
+
+def summarize(data: MapData) -> Dict[str, bool]:
+    """统计规则允许的特殊情况，用于与 MapGenerator 对比频率"""
+    types = Counter(data.room_types)
+    return {'connected': bin(int.from_bytes(data.edges, 'little')).count('1') == data.width * data.height - 1,
+            'boss': types[BOSS] == 1, 'start': types[START] == 1}
+
+
+@pytest.fixture(scope='module', params=CASES, ids=lambda case: '{}x{}-{}'.format(*case))
+def batch(request: pytest.FixtureRequest) -> MapBatch:
+    width, height, seed = request.param
+    return generate_arrays(MapConfig(grid_width=width, grid_height=height), 40, seed)
+
+
+def test_edges_form_forest(batch: MapBatch) -> None:
+    cells = batch.width * batch.height
+    for i in range(len(batch)):
+        right, down = batch.edges[i, :, :, 0], batch.edges[i, :, :, 1]
+        assert not right[:, -1].any() and not down[-1, :].any()
+        parent = list(range(cells))
+
+        def find(cell: int) -> int:
+            while parent[cell] != cell:
+                parent[cell] = parent[parent[cell]]
+                cell = parent[cell]
+            return cell
+
+        links = [(int(y) * batch.width + int(x), int(y) * batch.width + int(x) + 1)
+                 for y, x in zip(*np.nonzero(right))]
+        links += [(int(y) * batch.width + int(x), (int(y) + 1) * batch.width + int(x))
+                  for y, x in zip(*np.nonzero(down))]
+        for a, b in links:
+            # 每条边都连接两个不同的连通分量，即不存在环
+            assert find(a) != find(b)
+            parent[find(a)] = find(b)
+
+
+def test_distances_follow_edges(batch: MapBatch) -> None:
+    for i in range(len(batch)):
+        data = batch.to_map_data(i)
+        adjacency = room_adjacency(data)
+        for room in range(data.room_count):
+            neighbor_distances = [data.distances[n] for n in adjacency[room]]
+            if data.distances[room] < 0:
+                assert all(d < 0 for d in neighbor_distances)
+            elif data.distances[room] == 0:
+                assert data.room_types[room] in (START, REST)
+            else:
+                # 树中每个可达房间恰有一个更靠近起点的邻居
+                assert neighbor_distances.count(data.distances[room] - 1) == 1
+            assert bool(data.flags[room] & FLAG_LEAF) == (len(adjacency[room]) == 1)
+
+
+def test_special_rooms(batch: MapBatch) -> None:
+    for i in range(len(batch)):
+        data = batch.to_map_data(i)
+        counts = Counter(data.room_types)
+        assert ROOM_TYPE_CODES[RoomType.PENDING] not in counts
+        assert (batch.room_types[i, batch.room_count[i]:] == NO_ROOM).all()
+        assert counts[SHOP] <= 1 and counts[BOSS] <= 1
+        start = [r for r in range(data.room_count) if data.distances[r] == 0]
+        assert len(start) == 1 and (data.room_w[start[0]], data.room_h[start[0]]) == (1, 1)
+        # 起点只会被休息房间覆盖
+        assert data.room_types[start[0]] in (START, REST)
+        assert counts[START] == (data.room_types[start[0]] == START)
+
+        longest = max(data.distances)
+        leaves = [r for r in range(data.room_count) if data.flags[r] & FLAG_LEAF and r != start[0]]
+        if leaves:
+            assert counts[SHOP] == 1
+        for room in range(data.room_count):
+            if data.room_types[room] in (SHOP, BOSS):
+                assert data.flags[room] & FLAG_LEAF
+            if data.room_types[room] == BOSS:
+                assert data.distances[room] == longest
+        if not counts[BOSS]:
+            # 没有 Boss 时最远的叶子只能是已被选为商店的那个
+            assert all(data.room_types[r] == SHOP for r in leaves if data.distances[r] == longest)
+
+
+def test_rest_lies_on_main_path(batch: MapBatch) -> None:
+    for i in range(len(batch)):
+        data = batch.to_map_data(i)
+        if BOSS not in data.room_types:
+            assert not data.main_path() and REST not in data.room_types
+            continue
+        adjacency = room_adjacency(data)
+        # 树中从 Boss 沿距离递减的邻居走回起点即唯一路径，主路径不含 Boss 本身
+        path, current = [], data.room_types.index(BOSS)
+        while data.distances[current] > 0:
+            current = next(n for n in adjacency[current] if data.distances[n] == data.distances[current] - 1)
+            path.append(current)
+        assert sorted(data.main_path()) == sorted(path)
+        rests = [r for r in range(data.room_count) if data.room_types[r] == REST]
+        assert len(rests) <= 1
+        for room in rests:
+            assert room in path and data.flags[room] & FLAG_MAIN_PATH
+            assert (data.room_w[room], data.room_h[room]) == (1, 1)
+
+
+def test_to_map_data_round_trip(batch: MapBatch) -> None:
+    for i, data in enumerate(batch):
+        count = int(batch.room_count[i])
+        assert data.room_count == count
+        assert MapData.from_dict(data.to_dict()) == data
+        assert list(data.cell_rooms()) == batch.rooms[i].ravel().tolist()
+        assert data.room_types == bytearray(batch.room_types[i, :count].tolist())
+        assert list(data.distances) == batch.distances[i, :count].tolist()
+        assert data.flags == bytearray(batch.flags[i, :count].tolist())
+        for y in range(batch.height):
+            for x in range(batch.width):
+                bits = data.edge_bits((x + 1, y + 1))
+                assert bool(bits & EDGE_RIGHT) == batch.edges[i, y, x, 0]
+                assert bool(bits & EDGE_DOWN) == batch.edges[i, y, x, 1]
+
+
+def test_frequencies_match_generator() -> None:
+    config = MapConfig(grid_width=5, grid_height=5)
+    count = 1000
+    batch = generate_arrays(config, count, 5)
+    batch_types: Counter = Counter()
+    batch_cases: Counter = Counter()
+    for data in batch:
+        batch_types.update(ROOM_TYPE_NAMES[code] for code in data.room_types)
+        batch_cases.update(key for key, value in summarize(data).items() if value)
+    generator_types: Counter = Counter()
+    generator_cases: Counter = Counter()
+    for seed in range(count):
+        generator = MapGenerator(config, random.Random(seed))
+        generator.generate()
+        generator_types.update(room.color for room in generator.pending_room)
+        generator_cases.update(key for key, value in summarize(generator.to_map_data()).items() if value)
+
+    batch_rooms, generator_rooms = sum(batch_types.values()), sum(generator_types.values())
+    # 随机数序列不同，只允许统计误差
+    assert abs(batch_rooms - generator_rooms) / generator_rooms < 0.05
+    for room_type in set(batch_types) | set(generator_types):
+        assert abs(batch_types[room_type] / batch_rooms -
+                   generator_types[room_type] / generator_rooms) < 0.03, room_type
+    for case in ('connected', 'boss', 'start'):
+        assert abs(batch_cases[case] - generator_cases[case]) / count < 0.06, case
@@ -0,0 +1,34 @@
+"""NumPy 渲染后端与 PIL 渲染器的一致性"""
+from dataclasses import replace
+import pytest
+from batch import derive_seed, generate_map
+from numpy_renderer import NumpyMapRenderer
+from renderer import MapRenderer, get_renderer_class
+from config import MapConfig
+
+
+def test_default_backend_is_pil() -> None:
+    assert get_renderer_class(MapConfig()) is MapRenderer
+
+
+def test_numpy_backend_rejects_labels() -> None:
+    config = MapConfig(renderer='numpy')
+    with pytest.raises(ValueError):
+        get_renderer_class(config)
+    with pytest.raises(ValueError):
+        NumpyMapRenderer(5, 5, config)
+
+
+@pytest.mark.parametrize('grid,map_length,edge_width,object_margin', [
+    (5, 768, 15, 3), (5, 512, 8, 1), (13, 512, 4, 2), (7, 300, 3, 5)])
+def test_numpy_matches_pil_without_labels(grid: int, map_length: int,
+                                          edge_width: int, object_margin: int) -> None:
+    config = MapConfig(grid_width=grid, grid_height=grid, map_length=map_length,
+                       edge_width=edge_width, object_margin=object_margin, show_labels=False)
+    numpy_config = replace(config, renderer='numpy')
+    assert get_renderer_class(numpy_config) is NumpyMapRenderer
+    for i in range(5):
+        data = generate_map(config, derive_seed(11, i))
+        expected = MapRenderer.from_map_data(data, config).render()
+        actual = NumpyMapRenderer.from_map_data(data, numpy_config).render()
+        assert actual.tobytes() == expected.tobytes()
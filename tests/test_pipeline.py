@@ -0,0 +1,28 @@
+"""流式管线与输出端"""
+import os
+import pytest
+from batch import generate_batch
+from pipeline import MapSink, JsonLinesSink, iter_maps, read_json_lines, run_pipeline
+from config import MapConfig
+
+
+def test_incomplete_sink_fails_at_construction() -> None:
+    class NoWrite(MapSink):
+        pass
+
+    with pytest.raises(TypeError):
+        NoWrite()
+
+
+@pytest.mark.parametrize('name', ['maps.jsonl', 'maps.jsonl.gz'])
+def test_json_lines_round_trip(tmp_path, name: str) -> None:
+    config = MapConfig(grid_width=5, grid_height=5)
+    path = os.path.join(tmp_path, name)
+    assert run_pipeline(JsonLinesSink(path), config, count=10, seed=2) == 10
+    assert list(read_json_lines(path)) == generate_batch(config, 10, seed=2)
+
+
+def test_iter_maps_uses_all_cpus_when_workers_is_none() -> None:
+    config = MapConfig(grid_width=5, grid_height=5)
+    maps = [data for _, data, _ in iter_maps(config, 40, seed=3, workers=None, chunk_size=8)]
+    assert maps == generate_batch(config, 40, seed=3)
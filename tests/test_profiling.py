@@ -0,0 +1,62 @@
+"""阶段统计互不重叠、可以相加"""
+import random
+import time
+import tracemalloc
+from map_generator import MapGenerator
+from profiling import GENERATION_PHASES, GenerationStats, Profiler
+from config import MapConfig
+
+
+def test_nested_phase_is_not_counted_twice() -> None:
+    profiler = Profiler()
+    start = time.perf_counter()
+    with profiler.phase('outer'):
+        time.sleep(0.02)
+        with profiler.phase('inner'):
+            time.sleep(0.05)
+    total = time.perf_counter() - start
+    outer, inner = profiler.stats.phases['outer'], profiler.stats.phases['inner']
+    assert inner.wall >= 0.05
+    assert 0.02 <= outer.wall < 0.045
+    assert outer.wall + inner.wall <= total
+
+
+def test_generation_phases_add_up_to_generate() -> None:
+    profiler = Profiler()
+    for seed in range(50):
+        profiler.attach(MapGenerator(MapConfig(), random.Random(seed))).generate()
+    stats = profiler.stats
+    assert set(stats.phases) == set(GENERATION_PHASES)
+    phase_total = sum(stats.phases[name].wall for name in GENERATION_PHASES)
+    assert 0.7 * stats.wall <= phase_total <= stats.wall
+    assert stats.phases['bfs'].calls == stats.phases['assign_room_types'].calls == 50
+
+
+def test_traced_allocations_are_attributed_to_innermost_phase() -> None:
+    profiler = Profiler(trace_allocations=True)
+    was_tracing = tracemalloc.is_tracing()
+    try:
+        with profiler.phase('outer'):
+            with profiler.phase('inner'):
+                kept = [object() for _ in range(2000)]
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    outer, inner = profiler.stats.phases['outer'], profiler.stats.phases['inner']
+    assert inner.allocations >= 2000
+    assert inner.allocated_bytes >= 2000 * 16
+    assert outer.allocations < 100
+    assert len(kept) == 2000
+
+
+def test_stats_round_trip_and_merge() -> None:
+    profiler = Profiler()
+    for seed in range(5):
+        profiler.attach(MapGenerator(MapConfig(), random.Random(seed))).generate()
+    stats = profiler.stats
+    restored = GenerationStats.from_dict(stats.to_dict())
+    assert restored == stats
+    merged = GenerationStats().merge(stats).merge(restored)
+    assert merged.maps == 10
+    assert merged.wall == 2 * stats.wall
+    assert merged.phases['bfs'].calls == 10
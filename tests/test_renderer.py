@@ -0,0 +1,102 @@
+"""PIL 渲染器的局部重绘与标签缓存"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from PIL import Image, ImageDraw, ImageFont
+from map_generator import MapGenerator
+from models import Room
+from renderer import LabelCache
+from config import MapConfig, RoomType
+
+RECOLOR = {RoomType.BATTLE: RoomType.ELITES, RoomType.ELITES: RoomType.BATTLE,
+           RoomType.EVENT: RoomType.BLESSING, RoomType.BLESSING: RoomType.EVENT}
+
+
+def generate(config: MapConfig, seed: int) -> MapGenerator:
+    generator = MapGenerator(config, random.Random(seed))
+    generator.generate()
+    return generator
+
+
+def neighbors_of_overflowing(generator: MapGenerator) -> List[Room]:
+    """位于标签溢出房间右侧或下方、自身标签不溢出且可以换色的房间"""
+    overflowing = generator._renderer.overflowing
+    rooms = []
+    for room in overflowing:
+        x, y = room.topLeft
+        for pos in ((x + room.size[0], y), (x, y + room.size[1])):
+            neighbor = generator.get_room(pos)
+            if neighbor is not None and neighbor.color in RECOLOR and \
+                    neighbor not in overflowing and neighbor not in rooms:
+                rooms.append(neighbor)
+    return rooms
+
+
+def assert_rerender_matches(generator: MapGenerator, rooms: List[Room]) -> bool:
+    """换色后比较 rerender 与完整渲染，返回 rerender 是否走了局部重绘"""
+    for room in rooms:
+        room.color = RECOLOR[room.color]
+    renderer = generator._renderer
+    full_renders = []
+    render = renderer.render
+    renderer.render = lambda: full_renders.append(1) or render()
+    partial = generator.rerender()
+    del renderer.render
+    assert partial.tobytes() == generator.render().tobytes()
+    return not full_renders
+
+
+def test_rerender_matches_render_next_to_overflowing_labels() -> None:
+    config = MapConfig(grid_width=13, grid_height=13, map_length=512, edge_width=4,
+                       show_descriptions=False)
+    for seed in range(20):
+        generator = generate(config, seed)
+        generator.render()
+        for room in neighbors_of_overflowing(generator)[:3]:
+            assert_rerender_matches(generator, [room])
+
+
+def test_rerender_matches_render_after_recolor() -> None:
+    partial_redraws = 0
+    for seed in range(20):
+        generator = generate(MapConfig(), seed)
+        generator.render()
+        rooms = [room for room in generator.pending_room if room.color in RECOLOR]
+        partial_redraws += assert_rerender_matches(
+            generator, random.Random(seed).sample(rooms, min(2, len(rooms))))
+    assert partial_redraws > 0
+
+
+def test_reroll_types_rerender_matches_render() -> None:
+    for seed in range(10):
+        generator = generate(MapConfig(), seed)
+        generator.render()
+        generator.reroll_types(random.Random(seed + 100))
+        assert generator.rerender().tobytes() == generator.render().tobytes()
+
+
+def test_label_cache_matches_draw_text() -> None:
+    cache = LabelCache(max_size=2)
+    for text in ('battle', 'boss\nleaf\n7\nmain_path', 'empty', 'battle'):
+        direct = Image.new('RGB', (120, 80), (240, 240, 240))
+        ImageDraw.Draw(direct).text((5, 7), text, fill=(0, 0, 0), font=ImageFont.load_default())
+        cached = Image.new('RGB', (120, 80), (240, 240, 240))
+        cache.draw(ImageDraw.Draw(cached), (5, 7), text)
+        assert cached.tobytes() == direct.tobytes()
+    assert cache.stats() == {'size': 2, 'max_size': 2, 'hits': 0, 'misses': 4}
+
+
+def test_label_cache_is_thread_safe() -> None:
+    cache = LabelCache(max_size=8)
+    texts = [f'label {i}' for i in range(32)]
+
+    def work(seed: int) -> None:
+        rng = random.Random(seed)
+        for _ in range(500):
+            cache.get(rng.choice(texts))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(8)))
+    stats = cache.stats()
+    assert stats['size'] == 8
+    assert stats['hits'] + stats['misses'] == 8 * 500
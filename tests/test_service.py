@@ -0,0 +1,61 @@
+"""同步服务的参数校验与错误响应"""
+import json
+import threading
+from http.client import HTTPConnection
+from typing import Iterator, Tuple
+import pytest
+import service
+from service import FIELD_LIMITS, MapServer, MapService, parse_request
+
+
+@pytest.fixture
+def server() -> Iterator[MapServer]:
+    server = MapServer(('127.0.0.1', 0), MapService())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def get(server: MapServer, path: str) -> Tuple[int, dict]:
+    connection = HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_parse_request_accepts_limits() -> None:
+    config, seed = parse_request('seed=3&grid_width=64&grid_height=1&map_length=4096')
+    assert (config.grid_width, config.grid_height, config.map_length, seed) == (64, 1, 4096, 3)
+
+
+@pytest.mark.parametrize('name', sorted(FIELD_LIMITS))
+def test_parse_request_rejects_out_of_range(name: str) -> None:
+    low, high = FIELD_LIMITS[name]
+    for value in (low - 1, high + 1):
+        with pytest.raises(ValueError, match=name):
+            parse_request(f'seed=1&{name}={value}')
+
+
+def test_oversized_request_is_400(server: MapServer) -> None:
+    status, body = get(server, '/map?seed=1&grid_width=100000&grid_height=100000')
+    assert status == 400
+    assert 'grid_width' in body['error']
+
+
+def test_unexpected_error_is_500(server: MapServer, monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail(config: object, seed: int) -> None:
+        raise OverflowError('too large')
+
+    monkeypatch.setattr(service, 'generate_map', fail)
+    status, body = get(server, '/map?seed=1')
+    assert status == 500
+    assert 'OverflowError' in body['error']
+    # 连接未断开，服务仍可继续响应
+    assert get(server, '/stats')[0] == 200
@@ -0,0 +1,33 @@
+"""分块世界中相邻图块的连接"""
+import pytest
+from tiles import TiledWorld
+from config import MapConfig
+
+OPPOSITE = {'left': 'right', 'right': 'left', 'up': 'down', 'down': 'up'}
+OFFSETS = {'left': (-1, 0), 'right': (1, 0), 'up': (0, -1), 'down': (0, 1)}
+
+
+@pytest.mark.parametrize('grid,seed', [(3, 0), (5, 1), (9, 2)])
+def test_neighbors_agree_and_links_are_reachable(grid: int, seed: int) -> None:
+    world = TiledWorld(MapConfig(grid_width=grid, grid_height=grid), seed, bounds=(4, 4))
+    for tile in world.window(0, 0, 4, 4):
+        rooms = tile.data.cell_rooms()
+        for side, (cx, cy) in tile.links.items():
+            assert tile.data.distances[rooms[(cy - 1) * grid + cx - 1]] >= 0, (tile.x, tile.y, side)
+            dx, dy = OFFSETS[side]
+            other = world.tile(tile.x + dx, tile.y + dy).links[OPPOSITE[side]]
+            # 共享边界上的连接位置相同：竖直边界比较行，水平边界比较列
+            if dx:
+                assert other[1] == cy and {other[0], cx} == {1, grid}
+            else:
+                assert other[0] == cx and {other[1], cy} == {1, grid}
+
+
+def test_tiles_do_not_depend_on_generation_order() -> None:
+    config = MapConfig(grid_width=4, grid_height=4)
+    forward = TiledWorld(config, 7)
+    backward = TiledWorld(config, 7)
+    cells = [(x, y) for y in range(-2, 2) for x in range(-2, 2)]
+    expected = {cell: forward.tile(*cell).data for cell in cells}
+    for cell in reversed(cells):
+        assert backward.tile(*cell).data == expected[cell]
@@ -0,0 +1,185 @@
+"""分块生成的超大世界
+
+世界由 grid_width x grid_height 的图块拼接而成，每个图块是一张用独立种子生成的完整地图。
+相邻图块之间的连接位置只由世界种子和边界坐标决定，因此任一图块都可以单独生成，
+不需要先生成它的邻居。连接单元格不属于从起点可达的房间时，用派生种子重新生成该图块。图块与渲染结果按需生成并保存在有界 LRU 中，
+内存占用取决于活动窗口而不是世界大小。
+
+    python tiles.py --seed 1 --window 0 0 4 4 --output tiles/
+"""
+import argparse
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+from PIL import Image, ImageDraw
+from batch import derive_seed, generate_map
+from map_data import MapData
+from renderer import get_renderer_class
+from structures import LRUCache
+from config import MapConfig, DEFAULT_CONFIG
+
+# 为使连接单元格可达而重新生成图块的最大次数
+MAX_TILE_ATTEMPTS = 64
+
+
+def tile_seed(seed: int, x: int, y: int) -> int:
+    """由世界种子和图块坐标派生出图块的种子"""
+    digest = hashlib.blake2b(f'{seed}:tile:{x}:{y}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def border_offset(seed: int, kind: str, x: int, y: int, length: int) -> int:
+    """图块边界上连接单元格的位置（1 到 length）
+
+    kind 为 'v' 时表示 (x, y) 与 (x+1, y) 之间的竖直边界，为 'h' 时表示 (x, y) 与 (x, y+1) 之间的水平边界。
+    """
+    digest = hashlib.blake2b(f'{seed}:{kind}:{x}:{y}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % length + 1
+
+
+def links_reachable(data: MapData, links: Dict[str, Tuple[int, int]]) -> bool:
+    """检查所有连接单元格都属于从起点可达的房间"""
+    rooms = data.cell_rooms()
+    return all(data.distances[rooms[(y - 1) * data.width + x - 1]] >= 0 for x, y in links.values())
+
+
+@dataclass
+class Tile:
+    """一个图块及其与相邻图块的连接"""
+    x: int
+    y: int
+    data: MapData
+    links: Dict[str, Tuple[int, int]]  # 方向 ('left'/'right'/'up'/'down') -> 图块内的单元格位置
+
+
+class TiledWorld:
+    """按需生成图块的世界
+
+    Args:
+        config: 单个图块的生成与渲染配置
+        seed: 世界种子
+        bounds: 世界的图块数 (列, 行)，None 表示无限延伸，此时图块坐标可以为负
+        max_tiles: 缓存的图块数量上限
+        max_images: 缓存的图块图像数量上限
+    """
+
+    def __init__(self, config: MapConfig = DEFAULT_CONFIG, seed: int = 0,
+                 bounds: Optional[Tuple[int, int]] = None,
+                 max_tiles: int = 256, max_images: int = 64) -> None:
+        self.config = config
+        self.seed = seed
+        self.bounds = bounds
+        self.tiles: LRUCache[Tuple[int, int], Tile] = LRUCache(max_tiles)
+        self.images: LRUCache[Tuple[int, int], Image.Image] = LRUCache(max_images)
+
+    def contains(self, x: int, y: int) -> bool:
+        """检查图块坐标是否在世界范围内"""
+        if self.bounds is None:
+            return True
+        return 0 <= x < self.bounds[0] and 0 <= y < self.bounds[1]
+
+    def links(self, x: int, y: int) -> Dict[str, Tuple[int, int]]:
+        """计算图块与各相邻图块的连接单元格"""
+        width, height = self.config.grid_width, self.config.grid_height
+        links: Dict[str, Tuple[int, int]] = {}
+        if self.contains(x - 1, y):
+            links['left'] = (1, border_offset(self.seed, 'v', x - 1, y, height))
+        if self.contains(x + 1, y):
+            links['right'] = (width, border_offset(self.seed, 'v', x, y, height))
+        if self.contains(x, y - 1):
+            links['up'] = (border_offset(self.seed, 'h', x, y - 1, width), 1)
+        if self.contains(x, y + 1):
+            links['down'] = (border_offset(self.seed, 'h', x, y, width), height)
+        return links
+
+    def tile(self, x: int, y: int) -> Tile:
+        """获取图块，不在缓存中时生成"""
+        if not self.contains(x, y):
+            raise IndexError(f"Tile {(x, y)} is outside the world")
+        tile = self.tiles.get((x, y))
+        if tile is None:
+            links = self.links(x, y)
+            seed = tile_seed(self.seed, x, y)
+            # 连接位置由两侧共同决定，不能移动，只能重新生成本图块直到各连接单元格可达
+            for attempt in range(MAX_TILE_ATTEMPTS):
+                data = generate_map(self.config, derive_seed(seed, attempt) if attempt else seed)
+                if links_reachable(data, links):
+                    break
+            else:
+                raise RuntimeError(f"Tile {(x, y)} has no layout reaching all links "
+                                   f"after {MAX_TILE_ATTEMPTS} attempts")
+            tile = Tile(x, y, data, links)
+            self.tiles.put((x, y), tile)
+        return tile
+
+    def window(self, left: int, top: int, right: int, bottom: int) -> Iterator[Tile]:
+        """按行遍历 [left, right) x [top, bottom) 内的图块"""
+        for y in range(top, bottom):
+            for x in range(left, right):
+                if self.contains(x, y):
+                    yield self.tile(x, y)
+
+    def render_tile(self, x: int, y: int) -> Image.Image:
+        """渲染单个图块，连接相邻图块的边画到图像边缘，拼接后与相邻图块对齐"""
+        image = self.images.get((x, y))
+        if image is not None:
+            return image
+
+        tile = self.tile(x, y)
+        config = self.config
+        image = get_renderer_class(config).from_map_data(tile.data, config).render()
+        draw = ImageDraw.Draw(image)
+        cell_width = (config.map_length - config.page_margin * 2) // config.grid_width
+        cell_height = (config.map_length - config.page_margin * 2) // config.grid_height
+        margin = config.object_margin
+        for side, (cx, cy) in tile.links.items():
+            left = config.page_margin + (cx - 1) * cell_width
+            top = config.page_margin + (cy - 1) * cell_height
+            center_x, center_y = left + cell_width // 2, top + cell_height // 2
+            # 只画房间边距以外的部分，避免覆盖房间
+            if side == 'left':
+                segment = [0, center_y, left + margin, center_y]
+            elif side == 'right':
+                segment = [left + cell_width - margin, center_y, config.map_length, center_y]
+            elif side == 'up':
+                segment = [center_x, 0, center_x, top + margin]
+            else:
+                segment = [center_x, top + cell_height - margin, center_x, config.map_length]
+            draw.line(segment, fill='#00008B', width=config.edge_width)
+
+        self.images.put((x, y), image)
+        return image
+
+    def save_window(self, directory: str, left: int, top: int, right: int, bottom: int) -> int:
+        """将窗口内的图块按 {directory}/{x}/{y}.png 保存，返回保存数量"""
+        count = 0
+        for tile in self.window(left, top, right, bottom):
+            column = os.path.join(directory, str(tile.x))
+            os.makedirs(column, exist_ok=True)
+            self.render_tile(tile.x, tile.y).save(os.path.join(column, f'{tile.y}.png'))
+            count += 1
+        return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Render a window of a tiled world')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tile-grid', type=int, default=5, help='每个图块的单元格数')
+    parser.add_argument('--tile-length', type=int, default=256, help='每个图块图像的边长')
+    parser.add_argument('--bounds', type=int, nargs=2, metavar=('COLUMNS', 'ROWS'))
+    parser.add_argument('--window', type=int, nargs=4, default=[0, 0, 4, 4],
+                        metavar=('LEFT', 'TOP', 'RIGHT', 'BOTTOM'))
+    parser.add_argument('--output', default='tiles')
+    args = parser.parse_args()
+
+    config = MapConfig(grid_width=args.tile_grid, grid_height=args.tile_grid,
+                       map_length=args.tile_length, edge_width=max(1, args.tile_length // args.tile_grid // 6),
+                       show_descriptions=False)
+    world = TiledWorld(config, args.seed, tuple(args.bounds) if args.bounds else None)
+    count = world.save_window(args.output, *args.window)
+    print(f'Saved {count} tiles to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,20 @@
+import os
+import random
+from urllib.parse import urlencode
+from urllib.request import urlopen
 import streamlit
-import map_generator
-from config import MapConfig
+
+# 地图由 service.py 生成与缓存，页面只负责拼装请求
+SERVICE_URL = os.environ.get('MAP_SERVICE_URL', 'http://127.0.0.1:8765')
+
+
+@streamlit.cache_data(max_entries=256)
+def fetch_map_image(width: int, height: int, merge_chance: float, seed: int) -> bytes:
+    query = urlencode({'seed': seed, 'grid_width': width, 'grid_height': height,
+                       'merge_chance': merge_chance})
+    with urlopen(f'{SERVICE_URL}/render?{query}') as response:
+        return response.read()
+
 
 col1, col2 = streamlit.columns(2)
 
@@ -9,15 +23,8 @@ length_slider = col2.slider("Length", 2, 13, 5)
 merge_chance_slider = col1.slider("Merge Chance", 0.0, 1.0, 0.7)
 refresh_button = streamlit.button("Refresh")
 
-config = MapConfig(
-    grid_width=width_slider,
-    grid_height=length_slider,
-    merge_chance=merge_chance_slider
-)
-
-generator = map_generator.MapGenerator(config)
-
-generator.generate()
-img = generator.render()
+if refresh_button or 'seed' not in streamlit.session_state:
+    streamlit.session_state.seed = random.getrandbits(32)
 
-img
\ No newline at end of file
+streamlit.image(fetch_map_image(width_slider, length_slider, merge_chance_slider,
+                                streamlit.session_state.seed))